@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Usuario, Paciente, Medicamento, Prescricao, Administracao, Alerta
+from .models import Usuario, Paciente, Medicamento, Prescricao, Administracao, Alerta, ConfirmacaoAlerta
 
 class UsuarioAdmin(UserAdmin):
     model = Usuario
@@ -13,4 +13,4 @@ admin.site.register(Medicamento)
 admin.site.register(Prescricao)
 admin.site.register(Administracao)
 admin.site.register(Alerta)
-
+admin.site.register(ConfirmacaoAlerta)
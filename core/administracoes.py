@@ -0,0 +1,80 @@
+"""
+Registro de administrações em lote: as doses de uma ronda de medicação num
+único pedido e numa única transação, pela API
+(``AdministracoesLoteAPIView``) ou pela tela de ronda
+(``AdministracaoRondaView``).
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Administracao, Prescricao
+from .versoes import incrementar_versao
+
+# doses por envio; uma ronda tem algumas dezenas
+LOTE_MAXIMO = 200
+
+_ROTULOS_STATUS = dict(Prescricao.STATUS_CHOICES)
+
+# envios da tela de ronda já aceitos; o cache é compartilhado entre os workers
+PREFIXO_ENVIO = 'ronda:envio:'
+ENVIO_VALIDADE = 60 * 60  # segundos
+
+
+def novo_envio():
+    """Identificador de um formulário de ronda, aceito uma vez por ``reservar_envio``."""
+    return uuid.uuid4().hex
+
+
+def reservar_envio(envio):
+    """
+    ``True`` na primeira vez que ``envio`` chega; ``False`` num reenvio do
+    mesmo formulário (clique duplo, voltar e enviar de novo) ou se ele não
+    veio de ``novo_envio``.
+    """
+    if len(envio) != 32 or not all(c in '0123456789abcdef' for c in envio):
+        return False
+    return cache.add(PREFIXO_ENVIO + envio, True, ENVIO_VALIDADE)
+
+
+def registrar_lote(usuario, prescricao_ids):
+    """
+    Registra, em nome de ``usuario``, uma administração de cada prescrição
+    em ``prescricao_ids`` e devolve ``(administracoes, erros)``.
+
+    ``erros`` é ``{indice: [mensagem]}`` dos itens recusados: prescrição
+    inexistente, fora do status ativo ou repetida no lote. Os demais são
+    gravados mesmo assim, para a ronda não ter de ser refeita por um item.
+    """
+    with transaction.atomic():
+        # uma consulta valida o lote inteiro; as linhas ficam travadas até o
+        # commit, para uma suspensão concorrente não passar entre a
+        # conferência e a gravação (o SQLite ignora o FOR UPDATE, mas lá o
+        # BEGIN IMMEDIATE já segura o banco inteiro)
+        status = dict(
+            Prescricao.objects.select_for_update()
+            .filter(pk__in=set(prescricao_ids))
+            .values_list('id', 'status')
+        )
+
+        administracoes, erros, vistas = [], {}, set()
+        for indice, prescricao_id in enumerate(prescricao_ids):
+            if prescricao_id not in status:
+                erros[indice] = [f'Prescrição {prescricao_id} não existe.']
+            elif status[prescricao_id] != 'ativa':
+                rotulo = _ROTULOS_STATUS.get(status[prescricao_id], status[prescricao_id])
+                erros[indice] = [f'Prescrição {prescricao_id} não está ativa ({rotulo.lower()}).']
+            elif prescricao_id in vistas:
+                erros[indice] = [f'Prescrição {prescricao_id} repetida no lote.']
+            else:
+                vistas.add(prescricao_id)
+                administracoes.append(Administracao(prescricao_id=prescricao_id, usuario=usuario))
+
+        if administracoes:
+            administracoes = Administracao.objects.bulk_create(administracoes)
+            # bulk_create não dispara post_save: o carimbo da API (core.signals)
+            # é trocado aqui
+            transaction.on_commit(lambda: incrementar_versao('administracao'))
+
+    return administracoes, erros
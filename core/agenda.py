@@ -0,0 +1,218 @@
+"""
+Agenda em memória das ocorrências de alertas ativos das próximas horas.
+
+``AlertasPendentesAPIView``, o stream SSE e o ``DashboardView`` só precisam
+saber quais alertas disparam em janelas curtas a partir de agora. Em vez de
+uma consulta por requisição, cada processo mantém uma lista ordenada por
+horário (dia corrente + ``AGENDA_ALERTAS_HORIZONTE_HORAS``) com as
+ocorrências já expandidas pelo motor de recorrência (``core.recorrencia``) e
+responde às janelas com busca binária.
+
+A agenda é reconstruída (uma consulta) quando:
+
+- o carimbo de versão ``'alerta'`` no cache muda (escrita em outro worker);
+- a janela pedida sai da cobertura atual (virada do dia / horizonte);
+- a cópia ficou mais velha que ``AGENDA_ALERTAS_IDADE_MAXIMA`` segundos, só
+  como rede de proteção (ex.: cache reiniciado com um carimbo igual ao antigo).
+
+Escritas no próprio processo chegam pelos sinais ``post_save``/``post_delete``
+(ver ``core.signals``) e são aplicadas direto na lista, sem reconstrução,
+quando o incremento atômico do carimbo mostra que foram as únicas desde a
+cópia; senão a cópia é descartada.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+from django.utils import timezone
+
+from .models import Alerta
+from .recorrencia import Ocorrencia, ocorrencias, ocorrencias_do_alerta
+from .versoes import aobter_versao, incrementar_versao, obter_versao
+
+HORIZONTE = timedelta(hours=getattr(settings, 'AGENDA_ALERTAS_HORIZONTE_HORAS', 6))
+IDADE_MAXIMA = getattr(settings, 'AGENDA_ALERTAS_IDADE_MAXIMA', 60)
+
+
+def _inicio_do_dia(momento):
+    return datetime.combine(momento.date(), datetime.min.time(), tzinfo=momento.tzinfo)
+
+
+class _Retrato:
+    """Cópia imutável da agenda; leitores nunca veem uma lista pela metade."""
+
+    __slots__ = ('versao', 'inicio', 'fim', 'horarios', 'ocorrencias', 'criado_em')
+
+    def __init__(self, versao, inicio, fim, horarios, ocorrencias):
+        self.versao = versao
+        self.inicio = inicio
+        self.fim = fim
+        self.horarios = horarios
+        self.ocorrencias = ocorrencias
+        self.criado_em = time.monotonic()
+
+    def cobre(self, inicio, fim):
+        return self.inicio <= inicio and fim <= self.fim
+
+    def entre(self, inicio, fim, incluir_fim=False):
+        esq = bisect.bisect_left(self.horarios, inicio)
+        if incluir_fim:
+            dir_ = bisect.bisect_right(self.horarios, fim)
+        else:
+            dir_ = bisect.bisect_left(self.horarios, fim)
+        return self.ocorrencias[esq:dir_]
+
+    def contar(self, inicio, fim):
+        return bisect.bisect_left(self.horarios, fim) - bisect.bisect_left(self.horarios, inicio)
+
+    def proximo_apos(self, momento):
+        pos = bisect.bisect_right(self.horarios, momento)
+        if pos < len(self.horarios):
+            return self.horarios[pos]
+        return self.fim
+
+
+class AgendaAlertas:
+
+    def __init__(self):
+        self._retrato = None
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Leitura
+    # -----------------------------
+
+    def entre(self, inicio, fim, incluir_fim=False):
+        """Ocorrências com ``inicio <= data_hora < fim`` (ou ``<= fim``), em ordem."""
+        return self._obter(inicio, fim).entre(inicio, fim, incluir_fim)
+
+    def contar(self, inicio, fim):
+        """Quantidade de ocorrências com ``inicio <= data_hora < fim``."""
+        return self._obter(inicio, fim).contar(inicio, fim)
+
+    def proximo_apos(self, momento):
+        """
+        Primeiro horário agendado depois de ``momento``. Se não houver nenhum
+        dentro da cobertura, devolve o fim da cobertura: até lá, com certeza,
+        nada novo acontece sem uma escrita.
+        """
+        return self._obter(momento, momento).proximo_apos(momento)
+
+    # mesmas leituras para views assíncronas: a cópia válida é lida direto no
+    # event loop; a reconstrução (consulta ao banco) vai para uma thread
+
+    async def aentre(self, inicio, fim, incluir_fim=False):
+        return (await self._aobter(inicio, fim)).entre(inicio, fim, incluir_fim)
+
+    async def acontar(self, inicio, fim):
+        return (await self._aobter(inicio, fim)).contar(inicio, fim)
+
+    async def aproximo_apos(self, momento):
+        return (await self._aobter(momento, momento)).proximo_apos(momento)
+
+    def _obter(self, inicio, fim):
+        retrato = self._retrato
+        if retrato is not None and self._valido(retrato, inicio, fim):
+            return retrato
+
+        with self._lock:
+            # outra thread pode ter reconstruído enquanto esperávamos
+            retrato = self._retrato
+            if retrato is None or not self._valido(retrato, inicio, fim):
+                retrato = self._reconstruir(inicio, fim)
+            return retrato
+
+    async def _aobter(self, inicio, fim):
+        retrato = self._retrato
+        if (
+            retrato is not None
+            and self._recente(retrato, inicio, fim)
+            and retrato.versao == await aobter_versao('alerta')
+        ):
+            return retrato
+        return await sync_to_async(self._obter)(inicio, fim)
+
+    def _valido(self, retrato, inicio, fim):
+        return self._recente(retrato, inicio, fim) and retrato.versao == obter_versao('alerta')
+
+    def _recente(self, retrato, inicio, fim):
+        return retrato.cobre(inicio, fim) and time.monotonic() - retrato.criado_em < IDADE_MAXIMA
+
+    def _reconstruir(self, inicio, fim):
+        versao = obter_versao('alerta')
+        agora = timezone.now()
+
+        cobertura_inicio = min(_inicio_do_dia(agora), inicio)
+        cobertura_fim = max(
+            _inicio_do_dia(agora) + timedelta(days=1),
+            agora + HORIZONTE,
+            fim,
+        )
+
+        lista = list(ocorrencias(_alertas_ativos(), cobertura_inicio, cobertura_fim))
+
+        retrato = _Retrato(
+            versao,
+            cobertura_inicio,
+            cobertura_fim,
+            [ocorrencia.data_hora for ocorrencia in lista],
+            lista,
+        )
+        self._retrato = retrato
+        return retrato
+
+    # -----------------------------
+    # Escrita (sinais)
+    # -----------------------------
+
+    def registrar_alteracao(self, alerta_id):
+        """
+        Publica a nova versão para os outros workers e aplica a alteração na
+        cópia local. Chamado depois do commit de um save/delete de Alerta.
+        """
+        nova = incrementar_versao('alerta')
+
+        with self._lock:
+            retrato = self._retrato
+            if retrato is None:
+                return
+            if nova != retrato.versao + 1:
+                # houve outra escrita (aqui ou em outro worker) desde a cópia
+                # que ela não contém; reconstrói na leitura
+                self._retrato = None
+                return
+
+            horarios = []
+            lista = []
+            for ocorrencia in retrato.ocorrencias:
+                if ocorrencia.alerta.id != alerta_id:
+                    horarios.append(ocorrencia.data_hora)
+                    lista.append(ocorrencia)
+
+            alerta = _alertas_ativos().filter(pk=alerta_id).first()
+            if alerta is not None:
+                for momento in ocorrencias_do_alerta(alerta, retrato.inicio, retrato.fim):
+                    pos = bisect.bisect_right(horarios, momento)
+                    horarios.insert(pos, momento)
+                    lista.insert(pos, Ocorrencia(momento, alerta))
+
+            novo = _Retrato(nova, retrato.inicio, retrato.fim, horarios, lista)
+            novo.criado_em = retrato.criado_em
+            self._retrato = novo
+
+
+def _alertas_ativos():
+    # sempre do primário: o carimbo de versão muda no commit, e uma réplica
+    # atrasada geraria uma agenda velha marcada com a versão nova
+    return (
+        Alerta.objects.using(router.db_for_write(Alerta))
+        .filter(ativo=True)
+        .select_related('paciente', 'prescricao__medicamento')
+    )
+
+
+agenda = AgendaAlertas()
@@ -0,0 +1,251 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .agenda import agenda
+from .models import ConfirmacaoAlerta
+from .versoes import incrementar_versao
+
+# janela usada pelo badge/modal de alertas pendentes
+JANELA_PENDENTES = timedelta(minutes=5)
+
+
+def serializar_ocorrencia_pendente(ocorrencia):
+    alerta = ocorrencia.alerta
+    return {
+        "id": alerta.id,
+        "paciente": alerta.paciente.nome,
+        "tipo": alerta.get_tipo_alerta_display(),
+        "mensagem": alerta.mensagem,
+        # horário desta ocorrência (para alertas recorrentes difere de alerta.data_hora)
+        "data_hora": ocorrencia.data_hora.isoformat(),
+        "medicamento": (
+            alerta.prescricao.medicamento.nome
+            if alerta.prescricao and alerta.prescricao.medicamento
+            else None
+        ),
+    }
+
+
+def consultar_pendentes(agora):
+    """
+    Ocorrências de alertas ativos dentro da janela dos próximos 5 minutos,
+    lidas da agenda em memória (recorrências incluídas).
+    """
+    return agenda.entre(agora, agora + JANELA_PENDENTES, incluir_fim=True)
+
+
+async def aconsultar_pendentes(agora):
+    """``consultar_pendentes`` para views assíncronas."""
+    return await agenda.aentre(agora, agora + JANELA_PENDENTES, incluir_fim=True)
+
+
+def alertas_pendentes(agora=None):
+    """
+    Mesma consulta de ``consultar_pendentes``, já no formato devolvido pela API.
+    """
+    agora = agora or timezone.now()
+    return [serializar_ocorrencia_pendente(o) for o in consultar_pendentes(agora)]
+
+
+def proxima_mudanca_pendentes(agora, pendentes):
+    """
+    Momento em que a lista de pendentes muda sozinha, sem nenhuma escrita:
+    a primeira ocorrência da janela sai dela ou a próxima ocorrência entra.
+    """
+    return _primeira_mudanca(agenda.proximo_apos(agora + JANELA_PENDENTES), pendentes)
+
+
+async def aproxima_mudanca_pendentes(agora, pendentes):
+    """``proxima_mudanca_pendentes`` para views assíncronas."""
+    return _primeira_mudanca(await agenda.aproximo_apos(agora + JANELA_PENDENTES), pendentes)
+
+
+def _primeira_mudanca(proxima_ocorrencia, pendentes):
+    entrada = proxima_ocorrencia - JANELA_PENDENTES
+
+    if pendentes:
+        # sai da janela assim que o horário passa
+        saida = pendentes[0].data_hora + timedelta(microseconds=1)
+        return min(saida, entrada)
+
+    return entrada
+
+
+# -----------------------------
+# Confirmações por usuário
+# -----------------------------
+
+def chave_ocorrencia(item):
+    """Identifica uma ocorrência serializada: ``"<id>@<data_hora ISO>"`` (a mesma chave do frontend)."""
+    return f"{item['id']}@{item['data_hora']}"
+
+
+def ler_chave_ocorrencia(chave):
+    """
+    ``(alerta_id, data_hora)`` de uma chave; ``ValueError`` se malformada.
+    O horário precisa vir como a API o devolve: sem fuso com ``USE_TZ``
+    desligado, com fuso com ele ligado.
+    """
+    alerta_id, separador, data_hora = chave.partition('@')
+    if not separador:
+        raise ValueError(chave)
+    data_hora = datetime.fromisoformat(data_hora)
+    if timezone.is_aware(data_hora) != settings.USE_TZ:
+        raise ValueError(chave)
+    return int(alerta_id), data_hora
+
+
+def carimbos_pendentes(usuario):
+    """
+    Carimbos de versão (``core.versoes``) de que a lista de pendentes de
+    ``usuario`` depende: os modelos e as confirmações dele, que ``confirmar``
+    incrementa. Com eles e a próxima mudança da janela a API calcula o
+    ``ETag`` sem montar a lista.
+    """
+    return ('alerta', 'paciente', 'prescricao', 'medicamento', _carimbo_confirmacoes(usuario))
+
+
+def _carimbo_confirmacoes(usuario):
+    return f'confirmacoes:{usuario.pk}'
+
+
+def filtrar_confirmadas(usuario, itens):
+    """
+    Tira de ``itens`` (ocorrências serializadas) as que ``usuario`` já
+    confirmou. Uma consulta pelo índice único ``(usuario, data_hora, alerta)``,
+    limitada aos horários presentes; nenhuma se ``itens`` estiver vazio.
+    """
+    if not itens:
+        return itens
+
+    horarios = [datetime.fromisoformat(item['data_hora']) for item in itens]
+    confirmadas = set(_confirmadas(usuario, horarios))
+    return [item for item, horario in zip(itens, horarios) if (item['id'], horario) not in confirmadas]
+
+
+async def afiltrar_confirmadas(usuario, itens):
+    """``filtrar_confirmadas`` com o ORM assíncrono."""
+    if not itens:
+        return itens
+
+    horarios = [datetime.fromisoformat(item['data_hora']) for item in itens]
+    confirmadas = {par async for par in _confirmadas(usuario, horarios)}
+    return [item for item, horario in zip(itens, horarios) if (item['id'], horario) not in confirmadas]
+
+
+def confirmar(usuario, ocorrencias):
+    """
+    Grava as confirmações ``[(alerta_id, data_hora), ...]`` de ``usuario`` e
+    devolve quantas eram novas; as já confirmadas ficam como estão.
+    """
+    if not ocorrencias:
+        return 0
+    with transaction.atomic():
+        ja_confirmadas = set(_confirmadas(usuario, [data_hora for _, data_hora in ocorrencias]))
+        novas = [
+            ConfirmacaoAlerta(usuario=usuario, alerta_id=alerta_id, data_hora=data_hora)
+            for alerta_id, data_hora in ocorrencias
+            if (alerta_id, data_hora) not in ja_confirmadas
+        ]
+        # outra aba pode confirmar a mesma ocorrência ao mesmo tempo
+        ConfirmacaoAlerta.objects.bulk_create(novas, ignore_conflicts=True)
+        if novas:
+            nome = _carimbo_confirmacoes(usuario)
+            transaction.on_commit(lambda: incrementar_versao(nome))
+    return len(novas)
+
+
+def _confirmadas(usuario, horarios):
+    return (
+        ConfirmacaoAlerta.objects
+        .filter(usuario=usuario, data_hora__gte=min(horarios), data_hora__lte=max(horarios))
+        .values_list('alerta_id', 'data_hora')
+    )
+
+
+# -----------------------------
+# Cursor de delta (?since=)
+# -----------------------------
+
+def _impressao(item):
+    conteudo = json.dumps(item, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha1(conteudo.encode()).hexdigest()[:12]
+
+
+# o estado fica no cache e o cursor é só a chave: a URL do ?since= não
+# cresce com a lista
+PREFIXO_CURSOR = 'cursor_alertas:'
+# renovada a cada resposta 200 que o devolve; um 304 não toca no cache, e o
+# cliente com o cursor expirado recebe 400 e volta a pedir a lista inteira
+CURSOR_VALIDADE = 60 * 60  # segundos
+
+
+def _estado_cursor(itens):
+    estado = {chave_ocorrencia(item): _impressao(item) for item in itens}
+    bruto = json.dumps(estado, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(bruto.encode()).hexdigest()[:20], estado
+
+
+def _chave_cursor(cursor):
+    if len(cursor) != 20 or not all(c in '0123456789abcdef' for c in cursor):
+        raise ValueError(cursor)
+    return PREFIXO_CURSOR + cursor
+
+
+def codificar_cursor(itens):
+    """
+    Cursor das ocorrências entregues: um hash do estado ``{chave: impressao}``,
+    que fica guardado no cache. Listas iguais dão o mesmo cursor, para
+    qualquer usuário, e o próximo delta compara a lista atual com esse estado.
+    """
+    cursor, estado = _estado_cursor(itens)
+    cache.set(PREFIXO_CURSOR + cursor, estado, CURSOR_VALIDADE)
+    return cursor
+
+
+async def acodificar_cursor(itens):
+    """``codificar_cursor`` com a API assíncrona do cache."""
+    cursor, estado = _estado_cursor(itens)
+    await cache.aset(PREFIXO_CURSOR + cursor, estado, CURSOR_VALIDADE)
+    return cursor
+
+
+def decodificar_cursor(cursor):
+    """Estado ``{chave: impressao}`` do cursor; ``ValueError`` se inválido ou expirado."""
+    estado = cache.get(_chave_cursor(cursor))
+    if estado is None:
+        raise ValueError(cursor)
+    return estado
+
+
+async def adecodificar_cursor(cursor):
+    """``decodificar_cursor`` com a API assíncrona do cache."""
+    estado = await cache.aget(_chave_cursor(cursor))
+    if estado is None:
+        raise ValueError(cursor)
+    return estado
+
+
+def calcular_delta(itens, estado_anterior):
+    """
+    ``(novos_ou_alterados, removidos)`` entre ``itens`` e o estado de um
+    cursor: ocorrências que o cliente não tem (ou tem com outro conteúdo) e
+    chaves que ele tem e saíram da lista (passaram, foram confirmadas, o
+    alerta foi desativado ou excluído).
+    """
+    chaves_atuais = set()
+    novos = []
+    for item in itens:
+        chave = chave_ocorrencia(item)
+        chaves_atuais.add(chave)
+        if estado_anterior.get(chave) != _impressao(item):
+            novos.append(item)
+    removidos = [chave for chave in estado_anterior if chave not in chaves_atuais]
+    return novos, removidos
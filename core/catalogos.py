@@ -0,0 +1,93 @@
+"""
+Catálogos de dados de referência servidos do cache.
+
+Tabelas que quase nunca mudam (hoje, ``Medicamento``) são lidas inteiras
+uma vez, guardadas no cache (``CACHES['default']``) sob o carimbo de versão
+do modelo (``core.versoes``) e mantidas também na memória do processo. Em
+regime, uma leitura do catálogo custa só a leitura do carimbo, sem
+consulta ao banco.
+
+``post_save``/``post_delete`` do modelo trocam o carimbo depois do commit
+(ver ``core.signals``), o que invalida o catálogo em todos os workers.
+Escritas em massa que não disparam sinais (``QuerySet.update()``,
+``bulk_create()``) precisam chamar ``catalogo.invalidar()``.
+
+Dados derivados do catálogo (ex.: páginas serializadas da API) podem ser
+guardados com ``derivado()``; caem junto com o catálogo.
+"""
+import hashlib
+import threading
+
+from django.core.cache import cache
+from django.db import router
+
+from .models import Medicamento
+from .versoes import incrementar_versao, obter_versao
+
+PREFIXO = 'catalogo:'
+
+# os catálogos não expiram sozinhos: a troca de versão é que os descarta;
+# o timeout só limpa do cache as versões antigas
+TIMEOUT = 24 * 60 * 60
+
+
+class Catalogo:
+
+    def __init__(self, modelo, ordenacao=('id',)):
+        self.modelo = modelo
+        self.nome = modelo._meta.model_name
+        self.ordenacao = ordenacao
+        self._local = None  # (versao, itens, por_pk)
+        self._lock = threading.Lock()
+
+    def itens(self):
+        """Todos os registros, na ordem do catálogo."""
+        return self._obter()[1]
+
+    def obter(self, pk):
+        """Registro com a chave ``pk`` ou ``None``."""
+        return self._obter()[2].get(pk)
+
+    def derivado(self, chave, calcular):
+        """
+        Valor calculado a partir do catálogo, guardado no cache até a
+        próxima troca de versão.
+        """
+        # hash: ``chave`` pode ser uma URL inteira (memcached limita chaves)
+        resumo = hashlib.sha1(chave.encode()).hexdigest()
+        chave = f'{PREFIXO}{self.nome}:{obter_versao(self.nome)}:{resumo}'
+        valor = cache.get(chave)
+        if valor is None:
+            valor = calcular()
+            cache.set(chave, valor, TIMEOUT)
+        return valor
+
+    def invalidar(self):
+        incrementar_versao(self.nome)
+
+    def _obter(self):
+        versao = obter_versao(self.nome)
+        local = self._local
+        if local is not None and local[0] == versao:
+            return local
+
+        with self._lock:
+            local = self._local
+            if local is None or local[0] != versao:
+                local = self._carregar(versao)
+                self._local = local
+            return local
+
+    def _carregar(self, versao):
+        chave = f'{PREFIXO}{self.nome}:{versao}'
+        itens = cache.get(chave)
+        if itens is None:
+            # lê do primário: a versão nova já foi publicada e uma réplica
+            # atrasada guardaria o catálogo antigo com o carimbo novo
+            banco = router.db_for_write(self.modelo)
+            itens = list(self.modelo.objects.using(banco).order_by(*self.ordenacao))
+            cache.set(chave, itens, TIMEOUT)
+        return versao, itens, {item.pk: item for item in itens}
+
+
+medicamentos = Catalogo(Medicamento, ordenacao=('nome', 'id'))
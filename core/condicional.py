@@ -0,0 +1,97 @@
+"""
+GET condicional (``ETag`` / ``Last-Modified``) a partir dos carimbos de versão.
+
+O ``ETag`` resume os carimbos (``core.versoes``) dos modelos de que a
+resposta depende, a URL e o formato negociado; o ``Last-Modified`` é o
+horário da escrita mais recente entre eles. Nenhum dos dois consulta o
+banco, então um cliente com a cópia em dia recebe um 304 sem consulta nem
+serialização.
+
+Os carimbos são lidos antes de gerar a resposta: uma escrita concorrente
+pode deixar a resposta mais nova que o ``ETag``, nunca mais velha. Isso
+vale quando a resposta é lida do primário, onde o carimbo muda no commit.
+Uma réplica atrasada serviria dados velhos sob o carimbo novo: lida dela,
+a resposta sai sem validadores (``marcar=False``). O 304 continua valendo,
+porque o cliente só tem ``ETag`` de respostas lidas do primário.
+
+``Last-Modified`` tem resolução de segundos e não separa duas escritas no
+mesmo segundo; o ``If-None-Match`` tem precedência e é o que os clientes
+devem usar.
+"""
+import hashlib
+import inspect
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .versoes import aobter_versoes_e_alteracao, obter_versoes_e_alteracao
+
+
+def calcular_validadores(request, modelos, extra=()):
+    """
+    ``(etag, last_modified)``; ``last_modified`` em segundos (timestamp), ou
+    ``None`` enquanto nenhum dos modelos registrou escrita.
+    """
+    return _validadores(request, *obter_versoes_e_alteracao(*modelos), extra)
+
+
+def _validadores(request, versoes, alteracao, extra):
+    partes = [
+        request.get_full_path(),
+        getattr(request, 'accepted_media_type', ''),
+        *(f'{nome}={versao}' for nome, versao in sorted(versoes.items())),
+        *map(str, extra),
+    ]
+    etag = quote_etag(hashlib.sha1('|'.join(partes).encode()).hexdigest())
+    return etag, None if alteracao is None else alteracao // 1_000_000_000
+
+
+def responder_condicional(request, modelos, gerar, extra=(), com_last_modified=True, marcar=True):
+    """
+    Devolve 304 se o cliente já tem a versão atual; senão chama ``gerar()``
+    e marca a resposta com os validadores (a menos que ``marcar`` seja falso).
+
+    ``extra`` entra no ``ETag`` para respostas que não dependem só dos
+    modelos (ex.: a janela de alertas pendentes, que anda com o relógio);
+    nesses casos o carimbo não serve de ``Last-Modified``.
+    """
+    etag, ultima_alteracao = calcular_validadores(request, modelos, extra)
+    return _responder(request, etag, ultima_alteracao if com_last_modified else None, gerar, marcar)
+
+
+async def aresponder_condicional(request, modelos, gerar, extra=(), com_last_modified=True):
+    """
+    ``responder_condicional`` para views assíncronas; ``gerar()`` pode ser
+    síncrona ou uma corrotina, aguardada só quando não cabe o 304.
+    """
+    etag, ultima_alteracao = _validadores(request, *await aobter_versoes_e_alteracao(*modelos), extra)
+    ultima_alteracao = ultima_alteracao if com_last_modified else None
+    resposta = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if resposta is None:
+        resposta = gerar()
+        if inspect.isawaitable(resposta):
+            resposta = await resposta
+        if resposta.status_code != 200:
+            return resposta
+    return _marcar(resposta, etag, ultima_alteracao)
+
+
+def _responder(request, etag, ultima_alteracao, gerar, marcar=True):
+    resposta = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if resposta is None:
+        resposta = gerar()
+        if resposta.status_code != 200:
+            return resposta
+        if not marcar:
+            patch_cache_control(resposta, private=True, no_cache=True)
+            return resposta
+    return _marcar(resposta, etag, ultima_alteracao)
+
+
+def _marcar(resposta, etag, ultima_alteracao):
+    resposta.headers['ETag'] = etag
+    if ultima_alteracao is not None:
+        resposta.headers['Last-Modified'] = http_date(ultima_alteracao)
+    # o navegador guarda a cópia, mas revalida a cada uso
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
@@ -0,0 +1,72 @@
+from django.db import connections
+from django.db.models import F
+from django.db.models.lookups import StartsWith
+
+
+def contar(**querysets):
+    """
+    Conta vários querysets numa única ida ao banco:
+
+        SELECT (SELECT COUNT(*) FROM (...)) AS a, (SELECT COUNT(*) FROM (...)) AS b
+
+    Todos os querysets precisam estar no mesmo banco. Retorna um dict
+    ``{nome: total}``.
+    """
+    nomes = list(querysets)
+    alias = querysets[nomes[0]].db
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+
+    partes = []
+    params = []
+    for nome in nomes:
+        sql, sql_params = querysets[nome].order_by().values('pk').query.sql_with_params()
+        partes.append(f'(SELECT COUNT(*) FROM ({sql}) {quote("_" + nome)}) AS {quote(nome)}')
+        params.extend(sql_params)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(partes), params)
+        linha = cursor.fetchone()
+
+    return dict(zip(nomes, linha))
+
+
+# maior code point: qualquer texto que comece com o prefixo fica abaixo dele
+# (só na comparação por bytes do SQLite; ver Prefixo.as_sqlite)
+_FIM_PREFIXO = '\U0010ffff'
+
+
+class Prefixo(StartsWith):
+    """
+    ``startswith`` que o banco resolve com o índice B-tree da coluna (ou da
+    expressão, como ``Upper('nome')``).
+
+    No SQLite o ``LIKE`` não usa índice de expressão nem da colação BINARY
+    padrão; lá o "começa com" vira o intervalo
+    ``campo >= termo AND campo < termo || U+10FFFF``, exato porque a BINARY
+    compara os bytes UTF-8. Nos outros bancos fica o ``LIKE 'termo%'``: com
+    colações linguísticas (ICU) um limite superior fixo não é confiável, e o
+    PostgreSQL usa para o ``LIKE`` índices com ``text_pattern_ops``.
+    """
+    lookup_name = 'prefixo'
+
+    def as_sqlite(self, compiler, connection):
+        if not isinstance(self.rhs, str):
+            return self.as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        sql = f'({lhs} >= %s AND {lhs} < %s)'
+        return sql, (*lhs_params, self.rhs, *lhs_params, self.rhs + _FIM_PREFIXO)
+
+
+def filtro_prefixo(campo, termo):
+    """Condição "``campo`` começa com ``termo``" que usa índice (ver ``Prefixo``)."""
+    return Prefixo(F(campo), termo)
+
+
+def normalizar_busca(texto):
+    """
+    Forma de ``texto`` comparada nas buscas (``Paciente.nome_busca`` e o
+    termo digitado): maiúsculas pelas regras do Python, que cobrem letras
+    acentuadas; o ``UPPER()`` do SQLite só converte ASCII.
+    """
+    return texto.upper()
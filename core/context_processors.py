@@ -0,0 +1,8 @@
+from django.conf import settings
+from django.urls import reverse
+
+
+def alertas(request):
+    """URL da API de pendentes usada pelo polling do frontend (``ALERTAS_API_ASYNC``)."""
+    nome = 'alertas_pendentes_async' if settings.ALERTAS_API_ASYNC else 'alertas_pendentes_api'
+    return {'alertas_api_url': reverse(nome)}
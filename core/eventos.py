@@ -0,0 +1,166 @@
+"""
+Stream SSE (Server-Sent Events) de alertas pendentes.
+
+Em vez de cada aba consultar a API a cada 15 segundos, o navegador mantém uma
+conexão aberta e o servidor só envia um evento quando a lista de pendentes
+muda: um alerta entra/sai da janela de 5 minutos ou algum alerta é criado,
+editado, desativado ou excluído.
+
+Cada processo ASGI tem um único observador por event loop, compartilhado por
+todas as conexões abertas. O observador compara o carimbo de versão de
+alertas (ver ``core.versoes``) e só refaz a consulta quando ele muda ou
+quando chega o horário da próxima entrada/saída da janela.
+"""
+import asyncio
+import json
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .alertas import (
+    consultar_pendentes,
+    filtrar_confirmadas,
+    proxima_mudanca_pendentes,
+    serializar_ocorrencia_pendente,
+)
+from .versoes import obter_versao
+
+# de quanto em quanto tempo (s) o observador confere o carimbo de versão
+INTERVALO_VERIFICACAO = getattr(settings, 'ALERTAS_SSE_INTERVALO_VERIFICACAO', 2)
+
+# comentário enviado periodicamente para manter proxies/balanceadores abertos
+INTERVALO_KEEPALIVE = getattr(settings, 'ALERTAS_SSE_KEEPALIVE', 20)
+
+
+def _calcular_pendentes(agora):
+    pendentes = consultar_pendentes(agora)
+    itens = [serializar_ocorrencia_pendente(a) for a in pendentes]
+    return itens, proxima_mudanca_pendentes(agora, pendentes)
+
+
+def _dados_do_usuario(usuario, itens):
+    # cada conexão tira as ocorrências que o seu usuário já confirmou
+    return json.dumps({"alertas": filtrar_confirmadas(usuario, itens)}, cls=DjangoJSONEncoder)
+
+
+class CanalAlertasPendentes:
+    """
+    Observador único dos alertas pendentes para um event loop.
+
+    As conexões SSE se inscrevem com ``assinar()`` e recebem a lista mais
+    recente numa fila de tamanho 1 (só interessa o último estado).
+    """
+
+    def __init__(self):
+        self._assinantes = set()
+        self._tarefa = None
+        self.ultimo = None
+
+    def assinar(self):
+        fila = asyncio.Queue(maxsize=1)
+        if self.ultimo is not None:
+            # quem chega agora recebe de imediato o estado atual
+            fila.put_nowait(self.ultimo)
+        self._assinantes.add(fila)
+        if self._tarefa is None:
+            self._tarefa = asyncio.ensure_future(self._observar())
+        return fila
+
+    def cancelar(self, fila):
+        self._assinantes.discard(fila)
+
+    def _publicar(self, dados):
+        for fila in self._assinantes:
+            if fila.full():
+                fila.get_nowait()
+            fila.put_nowait(dados)
+
+    async def _observar(self):
+        versao = None
+        proxima_mudanca = None
+
+        try:
+            while self._assinantes:
+                agora = timezone.now()
+                versao_atual = await sync_to_async(obter_versao)('alerta')
+
+                if (
+                    versao_atual != versao
+                    or (proxima_mudanca is not None and agora >= proxima_mudanca)
+                ):
+                    versao = versao_atual
+                    dados, proxima_mudanca = await sync_to_async(_calcular_pendentes)(agora)
+
+                    if dados != self.ultimo:
+                        self.ultimo = dados
+                        self._publicar(dados)
+
+                espera = INTERVALO_VERIFICACAO
+                if proxima_mudanca is not None:
+                    faltam = (proxima_mudanca - timezone.now()).total_seconds()
+                    espera = max(min(espera, faltam), 0.05)
+                await asyncio.sleep(espera)
+        finally:
+            self._tarefa = None
+            # sem assinantes o estado envelhece; o próximo observador recalcula
+            self.ultimo = None
+
+
+_canais = weakref.WeakKeyDictionary()
+
+
+def obter_canal():
+    loop = asyncio.get_running_loop()
+    canal = _canais.get(loop)
+    if canal is None:
+        canal = _canais[loop] = CanalAlertasPendentes()
+    return canal
+
+
+async def _eventos(canal, fila, usuario):
+    try:
+        # tempo (ms) que o EventSource espera antes de reconectar
+        yield 'retry: 5000\n\n'
+
+        while True:
+            try:
+                itens = await asyncio.wait_for(fila.get(), timeout=INTERVALO_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            dados = await sync_to_async(_dados_do_usuario)(usuario, itens)
+            yield f'event: alertas\ndata: {dados}\n\n'
+    finally:
+        canal.cancelar(fila)
+
+
+async def alertas_pendentes_stream(request):
+    """
+    Stream SSE com a mesma carga de ``AlertasPendentesAPIView``.
+
+    Só funciona servido por ASGI; sob WSGI responde 204 para que o
+    EventSource desista e o frontend volte ao polling.
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return JsonResponse(
+            {"detail": "As credenciais de autenticação não foram fornecidas."},
+            status=403,
+        )
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    canal = obter_canal()
+    fila = canal.assinar()
+
+    response = StreamingHttpResponse(_eventos(canal, fila, usuario), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # evita que o nginx segure os eventos em buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
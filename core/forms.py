@@ -5,6 +5,53 @@ from .models import Paciente, Medicamento, Prescricao, Administracao, Alerta, Us
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from .models import Paciente, Medicamento, Prescricao, Administracao, Alerta, Usuario
+from . import catalogos
+
+
+class CatalogoChoiceIterator(forms.models.ModelChoiceIterator):
+    """Opções montadas a partir do catálogo em cache, sem consultar o banco."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for item in self.field.catalogo.itens():
+            yield self.choice(item)
+
+    def __len__(self):
+        return len(self.field.catalogo.itens()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.catalogo.itens())
+
+
+class CatalogoChoiceField(forms.ModelChoiceField):
+    """
+    ``ModelChoiceField`` servido por um ``core.catalogos.Catalogo``: as opções
+    e a validação do valor enviado usam o catálogo em cache.
+    """
+    catalogo = None
+    iterator = CatalogoChoiceIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.catalogo.modelo):
+            value = value.pk
+        try:
+            item = self.catalogo.obter(int(value))
+        except (TypeError, ValueError):
+            item = None
+        if item is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return item
+
+
+class MedicamentoChoiceField(CatalogoChoiceField):
+    catalogo = catalogos.medicamentos
 
 
 class PacienteForm(forms.ModelForm):
@@ -57,6 +104,10 @@ class PrescricaoForm(forms.ModelForm):
     class Meta:
         model = Prescricao
         fields = ['paciente', 'medicamento', 'dose', 'frequencia', 'status', 'observacoes']
+        field_classes = {
+            # opções do catálogo em cache (core.catalogos)
+            'medicamento': MedicamentoChoiceField,
+        }
         widgets = {
             'observacoes': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
         }
@@ -76,6 +127,8 @@ class AdministracaoForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # o rótulo de cada opção usa paciente e medicamento (Prescricao.__str__)
+        self.fields['prescricao'].queryset = Prescricao.objects.select_related('paciente', 'medicamento')
         self.fields['prescricao'].widget.attrs.update({'class': 'form-select'})
 
 
@@ -156,6 +209,9 @@ class AlertaForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # o rótulo de cada opção usa paciente e medicamento (Prescricao.__str__)
+        self.fields['prescricao'].queryset = Prescricao.objects.select_related('paciente', 'medicamento')
+
         # aplica 'form-control' nos selects/inputs normais que ainda não tenham classe
         for name, field in self.fields.items():
             if isinstance(field.widget, forms.CheckboxInput):
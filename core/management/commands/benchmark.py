@@ -0,0 +1,348 @@
+import json
+import math
+import platform
+import random
+import time
+import tracemalloc
+from io import StringIO
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.agenda import agenda
+from core.models import Usuario, Paciente, Medicamento, Prescricao
+
+# (nome, método, rota); os dados dos POSTs saem de Command._dados_post
+CENARIOS = [
+    ("api_alertas_pendentes", "get", "alertas_pendentes_api"),
+    ("dashboard", "get", "dashboard"),
+    ("api_pacientes", "get", "paciente-list"),
+    ("api_medicamentos", "get", "medicamento-list"),
+    ("api_prescricoes", "get", "prescricao-list"),
+    ("api_administracoes", "get", "administracao-list"),
+    ("api_alertas", "get", "alerta-list"),
+    ("html_pacientes", "get", "paciente_list"),
+    ("html_medicamentos", "get", "medicamento_list"),
+    ("html_prescricoes", "get", "prescricao_list"),
+    ("html_administracoes", "get", "administracao_list"),
+    ("html_alertas", "get", "alerta_list"),
+    ("criar_prescricao", "post", "prescricao_create"),
+    ("criar_administracao", "post", "administracao_create"),
+]
+
+# métricas comparadas com o baseline e se a comparação usa a tolerância
+METRICAS_COMPARADAS = [
+    ("p95_ms", True),
+    ("consultas", False),
+    ("pico_memoria_kb", True),
+]
+
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo (nearest-rank)."""
+    if not valores_ordenados:
+        return None
+    posto = max(math.ceil(p / 100 * len(valores_ordenados)), 1)
+    return valores_ordenados[posto - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede os caminhos mais usados (alertas pendentes, dashboard, listagens e "
+        "POSTs de prescrição/administração) com o test client, contra um banco de "
+        "teste populado pelo seed_demo_data. Gera um relatório JSON com p50/p95/p99, "
+        "consultas por requisição e pico de memória, e compara com um baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pacientes", type=int, default=1000,
+            help="Tamanho da base de teste (padrão: 1000 pacientes).",
+        )
+        parser.add_argument("--prescricoes-por-paciente", type=int, default=3)
+        parser.add_argument("--administracoes-por-prescricao", type=int, default=2)
+        parser.add_argument("--alertas-por-paciente", type=int, default=1)
+        parser.add_argument("--dias-historico", type=int, default=30)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--requisicoes", type=int, default=50,
+            help="Requisições medidas por cenário (padrão: 50).",
+        )
+        parser.add_argument(
+            "--aquecimento", type=int, default=5,
+            help="Requisições descartadas antes da medição (padrão: 5).",
+        )
+        parser.add_argument(
+            "--cenario", action="append", dest="cenarios", metavar="NOME",
+            help="Roda só os cenários indicados (pode repetir). Padrão: todos.",
+        )
+        parser.add_argument(
+            "--banco",
+            help=(
+                "Arquivo SQLite da base de teste. Sem ele o banco de teste padrão "
+                "do Django é usado (no SQLite, em memória)."
+            ),
+        )
+        parser.add_argument(
+            "--manter-banco", action="store_true",
+            help="Não apaga a base de teste no fim e reaproveita uma já populada.",
+        )
+        parser.add_argument(
+            "--saida",
+            help="Grava o relatório JSON neste arquivo (padrão: saída padrão).",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="Relatório JSON anterior para comparação; regressões encerram com erro.",
+        )
+        parser.add_argument(
+            "--tolerancia", type=float, default=0.2,
+            help="Piora relativa aceita em p95 e memória antes de acusar regressão (padrão: 0.2).",
+        )
+
+    def handle(self, *args, **options):
+        nomes = [nome for nome, _, _ in CENARIOS]
+        selecionados = options["cenarios"] or nomes
+        desconhecidos = set(selecionados) - set(nomes)
+        if desconhecidos:
+            raise CommandError(
+                f"Cenários desconhecidos: {', '.join(sorted(desconhecidos))}. "
+                f"Disponíveis: {', '.join(nomes)}."
+            )
+        if options["requisicoes"] < 1:
+            raise CommandError("--requisicoes precisa ser pelo menos 1.")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as arquivo:
+                baseline = json.load(arquivo)
+
+        self.options = options
+        self.rng = random.Random(options["seed"])
+
+        if options["banco"]:
+            connection.settings_dict["TEST"]["NAME"] = options["banco"]
+
+        setup_test_environment(debug=False)
+        antigos = setup_databases(
+            verbosity=0,
+            interactive=False,
+            keepdb=options["manter_banco"],
+            aliases={"default"},
+        )
+        try:
+            # cache isolado e sem métricas: não mistura nada com o servidor real
+            with override_settings(
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+                METRICAS_ATIVO=False,
+            ):
+                agenda._retrato = None
+                self._popular()
+                resultados = self._medir([c for c in CENARIOS if c[0] in selecionados])
+        finally:
+            teardown_databases(antigos, verbosity=0, keepdb=options["manter_banco"])
+            teardown_test_environment()
+
+        relatorio = {
+            "meta": {
+                "gerado_em": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "banco": connection.vendor,
+                "base": {
+                    chave: options[chave]
+                    for chave in (
+                        "pacientes",
+                        "prescricoes_por_paciente",
+                        "administracoes_por_prescricao",
+                        "alertas_por_paciente",
+                        "dias_historico",
+                        "seed",
+                    )
+                },
+                "requisicoes": options["requisicoes"],
+                "aquecimento": options["aquecimento"],
+            },
+            "cenarios": resultados,
+        }
+
+        texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto + "\n")
+        else:
+            self.stdout.write(texto)
+
+        regressoes = self._comparar(relatorio, baseline)
+        if regressoes:
+            raise CommandError(f"{len(regressoes)} regressão(ões) em relação ao baseline.")
+
+    # -----------------------------
+    # Preparação
+    # -----------------------------
+
+    def _popular(self):
+        if self.options["manter_banco"] and Paciente.objects.exists():
+            self.stderr.write("Reaproveitando a base de teste já populada.")
+        else:
+            self.stderr.write(f"Populando a base de teste ({self.options['pacientes']} pacientes)...")
+            call_command(
+                "seed_demo_data",
+                pacientes=self.options["pacientes"],
+                prescricoes_por_paciente=self.options["prescricoes_por_paciente"],
+                administracoes_por_prescricao=self.options["administracoes_por_prescricao"],
+                alertas_por_paciente=self.options["alertas_por_paciente"],
+                dias_historico=self.options["dias_historico"],
+                seed=self.options["seed"],
+                stdout=StringIO(),
+            )
+
+        self.client = Client()
+        self.client.force_login(Usuario.objects.get(username="admin"))
+
+        # amostra de ids para os POSTs (sorteados com a mesma seed)
+        self.pacientes_ids = list(Paciente.objects.values_list("id", flat=True)[:1000])
+        self.medicamentos_ids = list(Medicamento.objects.values_list("id", flat=True)[:1000])
+        self.prescricoes_ids = list(
+            Prescricao.objects.filter(status="ativa").values_list("id", flat=True)[:1000]
+        )
+
+    def _dados_post(self, nome):
+        if nome == "criar_prescricao":
+            return {
+                "paciente": self.rng.choice(self.pacientes_ids),
+                "medicamento": self.rng.choice(self.medicamentos_ids),
+                "dose": "1 comprimido",
+                "frequencia": "8/8h",
+                "status": "ativa",
+                "observacoes": "",
+            }
+        if nome == "criar_administracao":
+            return {"prescricao": self.rng.choice(self.prescricoes_ids)}
+        return None
+
+    # -----------------------------
+    # Medição
+    # -----------------------------
+
+    def _requisitar(self, nome, metodo, url):
+        if metodo == "post":
+            response = self.client.post(url, self._dados_post(nome))
+        else:
+            response = self.client.get(url)
+        if response.status_code >= 400:
+            raise CommandError(f"{nome}: {url} respondeu {response.status_code}.")
+        # o POST bem-sucedido redireciona; formulário inválido volta com 200
+        if metodo == "post" and response.status_code != 302:
+            raise CommandError(f"{nome}: {url} não aceitou os dados do POST.")
+        return response
+
+    def _medir(self, cenarios):
+        resultados = {}
+
+        for nome, metodo, rota in cenarios:
+            url = reverse(rota)
+
+            for _ in range(self.options["aquecimento"]):
+                self._requisitar(nome, metodo, url)
+
+            # tempo sem instrumentação nenhuma
+            duracoes = []
+            for _ in range(self.options["requisicoes"]):
+                inicio = time.perf_counter()
+                self._requisitar(nome, metodo, url)
+                duracoes.append((time.perf_counter() - inicio) * 1000)
+            duracoes.sort()
+
+            # consultas e memória numa passada separada (tracemalloc é caro)
+            amostras = min(self.options["requisicoes"], 5)
+            consultas = []
+            pico = 0
+            tracemalloc.start()
+            try:
+                for _ in range(amostras):
+                    tracemalloc.reset_peak()
+                    base, _ = tracemalloc.get_traced_memory()
+                    with CaptureQueriesContext(connection) as capturadas:
+                        self._requisitar(nome, metodo, url)
+                    _, atual_pico = tracemalloc.get_traced_memory()
+                    pico = max(pico, atual_pico - base)
+                    consultas.append(len(capturadas))
+            finally:
+                tracemalloc.stop()
+
+            resultados[nome] = {
+                "url": url,
+                "metodo": metodo.upper(),
+                "p50_ms": round(percentil(duracoes, 50), 3),
+                "p95_ms": round(percentil(duracoes, 95), 3),
+                "p99_ms": round(percentil(duracoes, 99), 3),
+                "media_ms": round(sum(duracoes) / len(duracoes), 3),
+                "consultas": max(consultas),
+                "pico_memoria_kb": round(pico / 1024, 1),
+            }
+            self.stderr.write(
+                f"  {nome:<24} p50 {resultados[nome]['p50_ms']:>8.2f} ms  "
+                f"p95 {resultados[nome]['p95_ms']:>8.2f} ms  "
+                f"p99 {resultados[nome]['p99_ms']:>8.2f} ms  "
+                f"{resultados[nome]['consultas']:>3} consultas  "
+                f"{resultados[nome]['pico_memoria_kb']:>9.1f} KiB"
+            )
+
+        return resultados
+
+    # -----------------------------
+    # Comparação
+    # -----------------------------
+
+    def _comparar(self, relatorio, baseline):
+        if baseline is None:
+            return []
+
+        if baseline.get("meta", {}).get("base") != relatorio["meta"]["base"]:
+            self.stderr.write(self.style.WARNING(
+                "Aviso: o baseline foi gerado com outra base de teste; a comparação é só indicativa."
+            ))
+
+        tolerancia = self.options["tolerancia"]
+        regressoes = []
+
+        self.stderr.write("")
+        self.stderr.write("Comparação com o baseline:")
+        for nome, atual in relatorio["cenarios"].items():
+            anterior = baseline.get("cenarios", {}).get(nome)
+            if anterior is None:
+                self.stderr.write(f"  {nome:<24} (sem baseline)")
+                continue
+
+            partes = []
+            piorou = False
+            for metrica, relativa in METRICAS_COMPARADAS:
+                valor, referencia = atual[metrica], anterior.get(metrica)
+                if referencia is None:
+                    continue
+                limite = referencia * (1 + tolerancia) if relativa else referencia
+                variacao = (valor - referencia) / referencia * 100 if referencia else 0.0
+                partes.append(f"{metrica} {referencia} -> {valor} ({variacao:+.0f}%)")
+                if valor > limite:
+                    piorou = True
+                    regressoes.append((nome, metrica, referencia, valor))
+
+            linha = f"  {nome:<24} " + "  ".join(partes)
+            self.stderr.write(self.style.ERROR(linha) if piorou else linha)
+
+        if not regressoes:
+            self.stderr.write(self.style.SUCCESS("Nenhuma regressão."))
+        return regressoes
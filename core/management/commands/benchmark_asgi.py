@@ -0,0 +1,274 @@
+import asyncio
+import json
+import platform
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.agenda import agenda
+from core.models import Usuario
+
+from .benchmark import percentil
+
+# (nome, rota); todos GET, com o usuário admin do seed logado
+CENARIOS = [
+    ("api_alertas_pendentes", "alertas_pendentes_api"),
+    ("alertas_pendentes_async", "alertas_pendentes_async"),
+    ("dashboard_dados_async", "dashboard_dados_async"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara requisições por segundo dos endpoints de polling sob WSGI (threads "
+        "chamando o WSGIHandler) e ASGI (corrotinas chamando o ASGIHandler) com muitos "
+        "clientes simultâneos, numa cópia temporária populada pelo seed_demo_data. Mede "
+        "os handlers do Django no próprio processo, sem servidor HTTP nem rede."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8,
+            help="Threads do lado WSGI, como os workers de um gunicorn (padrão: 8).",
+        )
+        parser.add_argument(
+            "--concorrencia", type=int, default=200,
+            help="Clientes simultâneos do lado ASGI (padrão: 200).",
+        )
+        parser.add_argument("--duracao", type=float, default=5, help="Segundos por medição (padrão: 5).")
+        parser.add_argument("--pacientes", type=int, default=500, help="Tamanho da base (padrão: 500).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--cenario", action="append", dest="cenarios", metavar="NOME",
+            help="Roda só os cenários indicados (pode repetir). Padrão: todos.",
+        )
+        parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo.")
+
+    def handle(self, *args, **options):
+        nomes = [nome for nome, _ in CENARIOS]
+        selecionados = options["cenarios"] or nomes
+        desconhecidos = set(selecionados) - set(nomes)
+        if desconhecidos:
+            raise CommandError(
+                f"Cenários desconhecidos: {', '.join(sorted(desconhecidos))}. "
+                f"Disponíveis: {', '.join(nomes)}."
+            )
+        if options["threads"] < 1 or options["concorrencia"] < 1:
+            raise CommandError("--threads e --concorrencia precisam ser pelo menos 1.")
+
+        self.options = options
+        resultados = {}
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            # banco em arquivo: as threads do lado WSGI abrem conexões próprias
+            connection.settings_dict["TEST"]["NAME"] = str(Path(diretorio) / "benchmark.sqlite3")
+            setup_test_environment(debug=False)
+            antigos = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+            try:
+                with override_settings(
+                    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+                    METRICAS_ATIVO=False,
+                ):
+                    agenda._retrato = None
+                    self._popular()
+                    for nome, rota in CENARIOS:
+                        if nome not in selecionados:
+                            continue
+                        url = reverse(rota)
+                        resultados[nome] = {
+                            "url": url,
+                            "wsgi": self._relatar(nome, "wsgi", self._medir_wsgi(url)),
+                            "asgi": self._relatar(nome, "asgi", asyncio.run(self._medir_asgi(url))),
+                        }
+            finally:
+                teardown_databases(antigos, verbosity=0)
+                teardown_test_environment()
+
+        relatorio = {
+            "meta": {
+                "gerado_em": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "banco": connection.vendor,
+                "pacientes": options["pacientes"],
+                "seed": options["seed"],
+                "threads_wsgi": options["threads"],
+                "concorrencia_asgi": options["concorrencia"],
+                "duracao_s": options["duracao"],
+            },
+            "cenarios": resultados,
+        }
+        texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto + "\n")
+        else:
+            self.stdout.write(texto)
+
+    # -----------------------------
+    # Preparação
+    # -----------------------------
+
+    def _popular(self):
+        self.stderr.write(f"Populando a base de teste ({self.options['pacientes']} pacientes)...")
+        call_command(
+            "seed_demo_data",
+            pacientes=self.options["pacientes"],
+            seed=self.options["seed"],
+            stdout=StringIO(),
+        )
+        cliente = Client()
+        cliente.force_login(Usuario.objects.get(username="admin"))
+        self.cookies = "; ".join(f"{nome}={morsel.value}" for nome, morsel in cliente.cookies.items())
+
+        self.wsgi = WSGIHandler()
+        self.asgi = ASGIHandler()
+
+    # -----------------------------
+    # Medição
+    # -----------------------------
+
+    def _medir_wsgi(self, url):
+        duracoes = []
+        erros = [0]
+        lock = threading.Lock()
+        fim = time.perf_counter() + self.options["duracao"]
+
+        def trabalhar():
+            locais, falhas = [], 0
+            try:
+                while time.perf_counter() < fim:
+                    inicio = time.perf_counter()
+                    if self._requisitar_wsgi(url) >= 400:
+                        falhas += 1
+                    locais.append(time.perf_counter() - inicio)
+            finally:
+                connection.close()
+            with lock:
+                duracoes.extend(locais)
+                erros[0] += falhas
+
+        threads = [threading.Thread(target=trabalhar) for _ in range(self.options["threads"])]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return duracoes, erros[0], time.perf_counter() - inicio
+
+    async def _medir_asgi(self, url):
+        duracoes = []
+        erros = 0
+        fim = time.perf_counter() + self.options["duracao"]
+
+        async def trabalhar():
+            nonlocal erros
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                if await self._requisitar_asgi(url) >= 400:
+                    erros += 1
+                duracoes.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhar() for _ in range(self.options["concorrencia"])))
+        return duracoes, erros, time.perf_counter() - inicio
+
+    # Os handlers de produção (os mesmos de wsgi.py/asgi.py), não os do test
+    # client: o ASGIHandler roda cada requisição no seu próprio contexto de
+    # threads, como sob uvicorn/daphne.
+
+    def _requisitar_wsgi(self, url):
+        ambiente = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": url,
+            "HTTP_HOST": "testserver",
+            "HTTP_COOKIE": self.cookies,
+            "wsgi.input": BytesIO(),
+        }
+        setup_testing_defaults(ambiente)
+        status = []
+        resposta = self.wsgi(ambiente, lambda linha, cabecalhos, exc_info=None: status.append(linha))
+        try:
+            b"".join(resposta)
+        finally:
+            resposta.close()
+        return int(status[0].split()[0])
+
+    async def _requisitar_asgi(self, url):
+        escopo = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": url,
+            "raw_path": url.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"cookie", self.cookies.encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        enviado = False
+        desconectado = asyncio.Event()
+        status = []
+
+        async def receber():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # o handler fica escutando uma desconexão até a resposta sair
+            await desconectado.wait()
+            return {"type": "http.disconnect"}
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status.append(mensagem["status"])
+
+        try:
+            await self.asgi(escopo, receber, enviar)
+        finally:
+            desconectado.set()
+        return status[0]
+
+    def _relatar(self, nome, servidor, medicao):
+        duracoes, erros, total_s = medicao
+        duracoes = sorted(d * 1000 for d in duracoes)
+        if not duracoes:
+            raise CommandError(f"{nome} ({servidor}): nenhuma requisição completou; aumente --duracao.")
+        if erros:
+            raise CommandError(f"{nome} ({servidor}): {erros} respostas com erro.")
+
+        resultado = {
+            "requisicoes": len(duracoes),
+            "rps": round(len(duracoes) / total_s, 1),
+            "p50_ms": round(percentil(duracoes, 50), 3),
+            "p95_ms": round(percentil(duracoes, 95), 3),
+            "p99_ms": round(percentil(duracoes, 99), 3),
+        }
+        self.stderr.write(
+            f"  {nome:<24} {servidor}  {resultado['rps']:>8.1f} req/s  "
+            f"p50 {resultado['p50_ms']:>8.2f} ms  p95 {resultado['p95_ms']:>8.2f} ms  "
+            f"p99 {resultado['p99_ms']:>8.2f} ms"
+        )
+        return resultado
@@ -0,0 +1,218 @@
+import json
+import random
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test import override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from core.consultas import contar
+from core.models import Usuario, Prescricao, Administracao
+from core.sqlite import ler_pragmas
+
+from .benchmark import percentil
+
+# perfil "antes": padrões do SQLite e do Django
+PERFIL_PADRAO = {
+    "pragmas": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "transaction_mode": "DEFERRED",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a vazão de leitores e escritores simultâneos no SQLite com o perfil "
+        "padrão e com o perfil de produção (SQLITE_PRAGMAS + transaction_mode do "
+        "settings), numa cópia temporária populada pelo seed_demo_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--leitores", type=int, default=4, help="Threads de leitura (padrão: 4).")
+        parser.add_argument("--escritores", type=int, default=2, help="Threads de escrita (padrão: 2).")
+        parser.add_argument("--duracao", type=float, default=10, help="Segundos por perfil (padrão: 10).")
+        parser.add_argument("--pacientes", type=int, default=500, help="Tamanho da base (padrão: 500).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("O banco 'default' não é SQLite.")
+        if options["leitores"] < 0 or options["escritores"] < 0 or options["leitores"] + options["escritores"] == 0:
+            raise CommandError("Informe pelo menos um leitor ou escritor.")
+
+        self.options = options
+        perfil_producao = {
+            "pragmas": getattr(settings, "SQLITE_PRAGMAS", {}),
+            "transaction_mode": connection.settings_dict["OPTIONS"].get("transaction_mode", "DEFERRED"),
+        }
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            # banco em arquivo (o de teste padrão do SQLite é em memória)
+            connection.settings_dict["TEST"]["NAME"] = str(Path(diretorio) / "benchmark.sqlite3")
+            antigos = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+            try:
+                with override_settings(CACHES={
+                    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                }):
+                    self.stderr.write(f"Populando a base ({options['pacientes']} pacientes)...")
+                    call_command("seed_demo_data", pacientes=options["pacientes"], seed=options["seed"], stdout=StringIO())
+                    self.prescricoes_ids = list(
+                        Prescricao.objects.filter(status="ativa").values_list("id", flat=True)[:1000]
+                    )
+                    self.usuarios_ids = list(Usuario.objects.values_list("id", flat=True))
+
+                    resultados = {
+                        "padrao": self._rodar("padrao", PERFIL_PADRAO),
+                        "producao": self._rodar("producao", perfil_producao),
+                    }
+            finally:
+                connections.close_all()
+                teardown_databases(antigos, verbosity=0)
+
+        self._imprimir(resultados)
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8") as arquivo:
+                json.dump(resultados, arquivo, indent=2)
+                arquivo.write("\n")
+
+    # -----------------------------
+    # Execução
+    # -----------------------------
+
+    def _rodar(self, nome, perfil):
+        opcoes = connections.settings["default"]["OPTIONS"]
+        modo_original = opcoes.get("transaction_mode")
+
+        connections.close_all()
+        opcoes["transaction_mode"] = perfil["transaction_mode"]
+        try:
+            with override_settings(SQLITE_PRAGMAS=perfil["pragmas"]):
+                # abre uma conexão para aplicar journal_mode (fica gravado no arquivo)
+                efetivos = ler_pragmas(connection, ["journal_mode", "synchronous", "busy_timeout"])
+                connection.close()
+
+                self.stderr.write(
+                    f"Perfil {nome}: {efetivos}, transaction_mode={perfil['transaction_mode']}, "
+                    f"{self.options['leitores']} leitores, {self.options['escritores']} escritores, "
+                    f"{self.options['duracao']:.0f}s..."
+                )
+                return self._medir_concorrencia(efetivos, perfil["transaction_mode"])
+        finally:
+            if modo_original is None:
+                opcoes.pop("transaction_mode", None)
+            else:
+                opcoes["transaction_mode"] = modo_original
+
+    def _medir_concorrencia(self, efetivos, transaction_mode):
+        total_threads = self.options["leitores"] + self.options["escritores"]
+        largada = threading.Barrier(total_threads + 1)
+        parar = threading.Event()
+        metricas = {
+            "leitura": {"latencias": [], "erros": 0},
+            "escrita": {"latencias": [], "erros": 0},
+        }
+        lock = threading.Lock()
+
+        def trabalhador(tipo, semente):
+            rng = random.Random(semente)
+            operacao = self._ler if tipo == "leitura" else self._escrever
+            latencias = []
+            erros = 0
+            try:
+                largada.wait()
+                while not parar.is_set():
+                    inicio = time.perf_counter()
+                    try:
+                        operacao(rng)
+                    except OperationalError:
+                        # "database is locked" e afins
+                        erros += 1
+                        continue
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                connection.close()
+                with lock:
+                    metricas[tipo]["latencias"].extend(latencias)
+                    metricas[tipo]["erros"] += erros
+
+        threads = [
+            threading.Thread(target=trabalhador, args=("leitura", self.options["seed"] + i))
+            for i in range(self.options["leitores"])
+        ] + [
+            threading.Thread(target=trabalhador, args=("escrita", self.options["seed"] + 1000 + i))
+            for i in range(self.options["escritores"])
+        ]
+        for thread in threads:
+            thread.start()
+
+        largada.wait()
+        inicio = time.perf_counter()
+        time.sleep(self.options["duracao"])
+        parar.set()
+        for thread in threads:
+            thread.join()
+        decorrido = time.perf_counter() - inicio
+
+        resultado = {"pragmas": efetivos, "transaction_mode": transaction_mode, "segundos": round(decorrido, 2)}
+        for tipo, dados in metricas.items():
+            latencias = sorted(dados["latencias"])
+            resultado[tipo] = {
+                "operacoes": len(latencias),
+                "por_segundo": round(len(latencias) / decorrido, 1),
+                "erros": dados["erros"],
+                "p50_ms": round(percentil(latencias, 50), 2) if latencias else None,
+                "p95_ms": round(percentil(latencias, 95), 2) if latencias else None,
+                "p99_ms": round(percentil(latencias, 99), 2) if latencias else None,
+            }
+        return resultado
+
+    def _ler(self, rng):
+        """Leitura no estilo do dashboard: contagens e últimas administrações."""
+        hoje = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        contar(
+            administracoes_hoje=Administracao.objects.filter(data_hora__gte=hoje),
+            prescricoes_ativas=Prescricao.objects.filter(status="ativa"),
+        )
+        list(
+            Administracao.objects
+            .select_related("prescricao__paciente", "prescricao__medicamento", "usuario")
+            .order_by("-data_hora", "-id")[:25]
+        )
+
+    def _escrever(self, rng):
+        """Registro de administração: confere a prescrição e grava, numa transação."""
+        with transaction.atomic():
+            prescricao_id = rng.choice(self.prescricoes_ids)
+            if not Prescricao.objects.filter(pk=prescricao_id, status="ativa").exists():
+                return
+            Administracao.objects.create(prescricao_id=prescricao_id, usuario_id=rng.choice(self.usuarios_ids))
+
+    # -----------------------------
+    # Relatório
+    # -----------------------------
+
+    def _imprimir(self, resultados):
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'perfil':<10} {'tipo':<8} {'ops/s':>9} {'erros':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for nome, resultado in resultados.items():
+            for tipo in ("leitura", "escrita"):
+                dados = resultado[tipo]
+                if not dados["operacoes"] and not dados["erros"]:
+                    continue
+                self.stdout.write(
+                    f"{nome:<10} {tipo:<8} {dados['por_segundo']:>9.1f} {dados['erros']:>7} "
+                    f"{self._ms(dados['p50_ms'])} {self._ms(dados['p95_ms'])} {self._ms(dados['p99_ms'])}"
+                )
+
+    def _ms(self, valor):
+        return f"{valor:>8.2f}" if valor is not None else f"{'-':>8}"
@@ -1,8 +1,10 @@
 import random
+from contextlib import contextmanager
 from datetime import date, timedelta
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import Max
 from django.utils import timezone
 
 from core.models import (
@@ -13,33 +15,161 @@ from core.models import (
     Administracao,
     Alerta,
 )
+from core.consultas import normalizar_busca
+from core.recorrencia import calcular_fase
+from core.versoes import incrementar_versao
+
+PRIMEIROS_NOMES = [
+    "Ana", "Bruno", "Carlos", "Daniela", "Eduardo", "Fernanda", "Gabriel",
+    "Helena", "Igor", "Julia", "Karen", "Lucas", "Mariana", "Nicolas",
+    "Olivia", "Paulo", "Rafaela", "Tiago", "Valeria", "Wesley",
+]
+
+SOBRENOMES = [
+    "Souza", "Lima", "Silva", "Costa", "Pereira", "Rocha", "Martins",
+    "Santos", "Almeida", "Ribeiro", "Oliveira", "Ferreira", "Gomes",
+    "Araujo", "Mendes", "Moreira", "Carvalho", "Nunes", "Campos",
+]
+
+DOSES = [
+    "1 comprimido",
+    "1 comprimido e meio",
+    "2 comprimidos",
+    "10 gotas",
+    "1 ampola",
+]
+
+FREQUENCIAS = [
+    "8/8h",
+    "12/12h",
+    "24/24h",
+    "6/6h se dor",
+    "1x ao dia",
+]
+
+OBSERVACOES = [
+    "Tomar preferencialmente após as refeições.",
+    "Manter hidratação adequada.",
+    "Monitorar pressão arterial diariamente.",
+    "Suspender em caso de reação alérgica.",
+    "Evitar dirigir ou operar máquinas.",
+    "",
+]
+
+STATUS = ["ativa", "ativa", "ativa", "suspensa", "encerrada"]
+
+MENSAGENS_PRESCRICAO = [
+    "Verificar horário da próxima administração.",
+    "Confirmar dose antes da administração.",
+    "Avaliar sinais vitais antes da medicação.",
+    "Checar histórico de alergias antes da medicação.",
+]
+
+MENSAGENS_OUTROS = [
+    "Reavaliar dor do paciente.",
+    "Monitorar nível de consciência.",
+    "Verificar balanço hídrico.",
+    "Agendar reavaliação com equipe médica.",
+    "Checar glicemia capilar.",
+]
+
+INTERVALOS = [choice for choice, _ in Alerta.INTERVALO_CHOICES]
+
+
+@contextmanager
+def datas_manuais(*modelos):
+    """
+    Desliga ``auto_now``/``auto_now_add`` dos modelos enquanto o bloco roda,
+    para que o ``bulk_create`` grave as datas históricas geradas pelo seed.
+    """
+    campos = [
+        (campo, campo.auto_now, campo.auto_now_add)
+        for modelo in modelos
+        for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+    ]
+    try:
+        for campo, _, _ in campos:
+            campo.auto_now = campo.auto_now_add = False
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in campos:
+            campo.auto_now = auto_now
+            campo.auto_now_add = auto_now_add
 
 
 class Command(BaseCommand):
-    help = "Cria dados de exemplo (seeds) para a aplicação de medicação hospitalar."
+    help = (
+        "Cria dados de exemplo (seeds) para a aplicação de medicação hospitalar. "
+        "As opções de volume permitem montar bases grandes para testes de carga; "
+        "com a mesma --seed e as mesmas opções os dados gerados são sempre os "
+        "mesmos (as datas são relativas ao momento da execução)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pacientes", type=int, default=20,
+            help="Quantidade de pacientes a criar (padrão: 20).",
+        )
+        parser.add_argument(
+            "--prescricoes-por-paciente", type=int, default=1,
+            help="Prescrições criadas para cada paciente (padrão: 1).",
+        )
+        parser.add_argument(
+            "--administracoes-por-prescricao", type=int, default=1,
+            help="Administrações registradas para cada prescrição (padrão: 1).",
+        )
+        parser.add_argument(
+            "--alertas-por-paciente", type=int, default=1,
+            help="Alertas criados para cada paciente (padrão: 1).",
+        )
+        parser.add_argument(
+            "--dias-historico", type=int, default=30,
+            help="Quantos dias para trás espalhar prescrições e administrações (padrão: 30).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=42,
+            help="Semente do gerador aleatório (padrão: 42).",
+        )
+        parser.add_argument(
+            "--lote", type=int, default=2000,
+            help="Pacientes gerados e gravados por vez; limita a memória usada (padrão: 2000).",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
+        for opcao in (
+            "pacientes",
+            "prescricoes_por_paciente",
+            "administracoes_por_prescricao",
+            "alertas_por_paciente",
+            "dias_historico",
+        ):
+            if options[opcao] < 0:
+                raise CommandError(f"--{opcao.replace('_', '-')} não pode ser negativo.")
+        if options["lote"] < 1:
+            raise CommandError("--lote precisa ser pelo menos 1.")
+
+        self.rng = random.Random(options["seed"])
+        self.agora = timezone.now().replace(second=0, microsecond=0)
+        self.options = options
+
         self.stdout.write(self.style.MIGRATE_HEADING("Iniciando seed de dados de exemplo..."))
 
-        admin_user, medico_user, enfermeiro_user = self._create_users()
+        with transaction.atomic():
+            admin_user, medico_user, enfermeiro_user = self._create_users()
         self.stdout.write(self.style.SUCCESS("✔ Usuários de exemplo criados."))
 
-        pacientes = self._create_pacientes()
-        self.stdout.write(self.style.SUCCESS(f"✔ {len(pacientes)} pacientes criados/recuperados."))
-
-        medicamentos = self._create_medicamentos()
+        with transaction.atomic():
+            medicamentos = self._create_medicamentos()
         self.stdout.write(self.style.SUCCESS(f"✔ {len(medicamentos)} medicamentos criados/recuperados."))
 
-        prescricoes = self._create_prescricoes(pacientes, medicamentos, medico_user)
-        self.stdout.write(self.style.SUCCESS(f"✔ {len(prescricoes)} prescrições criadas."))
-
-        administracoes = self._create_administracoes(prescricoes, medico_user, enfermeiro_user)
-        self.stdout.write(self.style.SUCCESS(f"✔ {len(administracoes)} administrações criadas."))
-
-        alertas = self._create_alertas(pacientes, prescricoes)
-        self.stdout.write(self.style.SUCCESS(f"✔ {len(alertas)} alertas criados."))
+        with datas_manuais(Prescricao, Administracao, Alerta):
+            totais = self._create_em_lotes(medicamentos, medico_user, [medico_user, enfermeiro_user])
 
+        self.stdout.write(self.style.SUCCESS(f"✔ {totais['pacientes']} pacientes criados."))
+        self.stdout.write(self.style.SUCCESS(f"✔ {totais['prescricoes']} prescrições criadas."))
+        self.stdout.write(self.style.SUCCESS(f"✔ {totais['administracoes']} administrações criadas."))
+        self.stdout.write(self.style.SUCCESS(f"✔ {totais['alertas']} alertas criados."))
         self.stdout.write(self.style.SUCCESS("Seed concluído com sucesso."))
 
     # -----------------------------
@@ -92,53 +222,6 @@ class Command(BaseCommand):
 
         return admin_user, medico_user, enfermeiro_user
 
-    def _create_pacientes(self):
-        nomes_base = [
-            "Ana Souza",
-            "Bruno Lima",
-            "Carlos Silva",
-            "Daniela Costa",
-            "Eduardo Pereira",
-            "Fernanda Rocha",
-            "Gabriel Martins",
-            "Helena Santos",
-            "Igor Almeida",
-            "Julia Ribeiro",
-            "Karen Oliveira",
-            "Lucas Ferreira",
-            "Mariana Gomes",
-            "Nicolas Araujo",
-            "Olivia Mendes",
-            "Paulo Henrique",
-            "Rafaela Moreira",
-            "Tiago Carvalho",
-            "Valeria Nunes",
-            "Wesley Campos",
-        ]
-
-        pacientes = []
-        base_date = date(1980, 1, 1)
-
-        for idx, nome in enumerate(nomes_base, start=1):
-            prontuario = f"P{idx:04d}"
-            cpf = f"{10000000000 + idx}"
-
-            paciente, _ = Paciente.objects.get_or_create(
-                prontuario=prontuario,
-                defaults={
-                    "nome": nome,
-                    "cpf": cpf,
-                    "data_nascimento": base_date + timedelta(days=idx * 365 // 2),
-                    "sexo": random.choice(["M", "F", "O"]),
-                    "telefone_contato": f"(35) 9{9000 + idx:04d}-{1000 + idx:04d}",
-                    "alergias": "Sem alergias conhecidas.",
-                    "historico_clinico": "Paciente sem histórico clínico relevante para este ambiente de teste.",
-                },
-            )
-            pacientes.append(paciente)
-
-        return pacientes
-
     def _create_medicamentos(self):
         medicamentos_def = [
             ("Dipirona", "500 mg", "VO"),
@@ -185,139 +268,142 @@ class Command(BaseCommand):
 
         return medicamentos
 
-    def _create_prescricoes(self, pacientes, medicamentos, medico_user):
-        descricoes_dose = [
-            "1 comprimido",
-            "1 comprimido e meio",
-            "2 comprimidos",
-            "10 gotas",
-            "1 ampola",
-        ]
-        frequencias = [
-            "8/8h",
-            "12/12h",
-            "24/24h",
-            "6/6h se dor",
-            "1x ao dia",
-        ]
-        observacoes_opc = [
-            "Tomar preferencialmente após as refeições.",
-            "Manter hidratação adequada.",
-            "Monitorar pressão arterial diariamente.",
-            "Suspender em caso de reação alérgica.",
-            "Evitar dirigir ou operar máquinas.",
-            "",
-        ]
-        status_opc = ["ativa", "ativa", "ativa", "suspensa", "encerrada"]
+    def _create_em_lotes(self, medicamentos, medico_user, equipe):
+        """
+        Gera os pacientes em lotes de ``--lote``; cada lote (pacientes e seus
+        registros) é gravado com ``bulk_create`` numa transação própria e
+        descartado antes do próximo. Uma base grande não fica presa numa
+        transação só: os lotes já gravados ficam visíveis (e no banco, se o
+        seed for interrompido), e cada commit é curto.
+        """
+        total = self.options["pacientes"]
+        tamanho_lote = self.options["lote"]
+        # numeração continua depois dos pacientes existentes (prontuário/CPF são únicos)
+        ultimo_id = Paciente.objects.aggregate(ultimo=Max("id"))["ultimo"] or 0
+
+        totais = {"pacientes": 0, "prescricoes": 0, "administracoes": 0, "alertas": 0}
+
+        for inicio in range(0, total, tamanho_lote):
+            fim = min(inicio + tamanho_lote, total)
+            lote = {"pacientes": [], "prescricoes": [], "administracoes": [], "alertas": []}
+
+            for idx in range(ultimo_id + inicio + 1, ultimo_id + fim + 1):
+                self._gerar_paciente(idx, lote, medicamentos, medico_user, equipe)
+
+            with transaction.atomic():
+                # pais antes dos filhos: o bulk_create preenche os ids usados nas FKs
+                Paciente.objects.bulk_create(lote["pacientes"])
+                Prescricao.objects.bulk_create(lote["prescricoes"])
+                Administracao.objects.bulk_create(lote["administracoes"])
+                Alerta.objects.bulk_create(lote["alertas"])
+
+                # bulk_create não dispara sinais: avisa agenda/dashboard dos
+                # outros processos e invalida o GET condicional da API
+                for nome in ("paciente", "prescricao", "administracao", "alerta"):
+                    transaction.on_commit(lambda nome=nome: incrementar_versao(nome))
+
+            for chave, objetos in lote.items():
+                totais[chave] += len(objetos)
+
+            if total > tamanho_lote:
+                self.stdout.write(f"  {fim}/{total} pacientes gravados...")
+
+        return totais
+
+    def _momento_historico(self):
+        """Momento aleatório entre ``--dias-historico`` dias atrás e agora."""
+        minutos = self.options["dias_historico"] * 24 * 60
+        return self.agora - timedelta(minutes=self.rng.randrange(minutos + 1))
+
+    def _gerar_paciente(self, idx, lote, medicamentos, medico_user, equipe):
+        rng = self.rng
+
+        nome = f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)}"
+        paciente = Paciente(
+            nome=nome,
+            # bulk_create não passa por Paciente.save()
+            nome_busca=normalizar_busca(nome),
+            cpf=f"{10000000000 + idx}",
+            data_nascimento=date(1940, 1, 1) + timedelta(days=rng.randrange(80 * 365)),
+            sexo=rng.choice(["M", "F", "O"]),
+            prontuario=f"P{idx:07d}",
+            telefone_contato=f"(35) 9{rng.randrange(10000):04d}-{rng.randrange(10000):04d}",
+            alergias="Sem alergias conhecidas.",
+            historico_clinico="Paciente sem histórico clínico relevante para este ambiente de teste.",
+        )
+        lote["pacientes"].append(paciente)
 
         prescricoes = []
-
-        if not pacientes or not medicamentos:
-            return prescricoes
-
-        for _ in range(20):
-            paciente = random.choice(pacientes)
-            medicamento = random.choice(medicamentos)
-            dose = random.choice(descricoes_dose)
-            freq = random.choice(frequencias)
-            status = random.choice(status_opc)
-            obs = random.choice(observacoes_opc)
-
-            prescricao = Prescricao.objects.create(
+        for _ in range(self.options["prescricoes_por_paciente"]):
+            criada_em = self._momento_historico()
+            prescricao = Prescricao(
                 paciente=paciente,
-                medicamento=medicamento,
+                medicamento=rng.choice(medicamentos),
                 medico=medico_user,
-                dose=dose,
-                frequencia=freq,
-                status=status,
-                observacoes=obs,
+                dose=rng.choice(DOSES),
+                frequencia=rng.choice(FREQUENCIAS),
+                status=rng.choice(STATUS),
+                observacoes=rng.choice(OBSERVACOES),
+                data_criacao=criada_em,
+                data_ultima_atualizacao=criada_em,
             )
             prescricoes.append(prescricao)
 
-        return prescricoes
-
-    def _create_administracoes(self, prescricoes, medico_user, enfermeiro_user):
-        administracoes = []
-
-        if not prescricoes:
-            return administracoes
-
-        usuarios_possiveis = [u for u in [medico_user, enfermeiro_user] if u is not None]
-
-        for _ in range(10):
-            prescricao = random.choice(prescricoes)
-            usuario = random.choice(usuarios_possiveis)
-            # data_hora é auto_now_add, então não precisa setar aqui
-            adm = Administracao.objects.create(
-                prescricao=prescricao,
-                usuario=usuario,
-            )
-            administracoes.append(adm)
-
-        return administracoes
-
-    def _create_alertas(self, pacientes, prescricoes):
-        alertas = []
-
-        if not pacientes:
-            return alertas
-
-        agora = timezone.now()
-
-        mensagens_prescricao = [
-            "Verificar horário da próxima administração.",
-            "Confirmar dose antes da administração.",
-            "Avaliar sinais vitais antes da medicação.",
-            "Checar histórico de alergias antes da medicação.",
-        ]
-
-        mensagens_outros = [
-            "Reavaliar dor do paciente.",
-            "Monitorar nível de consciência.",
-            "Verificar balanço hídrico.",
-            "Agendar reavaliação com equipe médica.",
-            "Checar glicemia capilar.",
-        ]
-
-        # 10 alertas ligados a prescrição (se existirem)
-        for i in range(10):
-            paciente = random.choice(pacientes)
-            prescricao = random.choice(prescricoes) if prescricoes else None
-            msg = random.choice(mensagens_prescricao)
-            minutos_no_futuro = random.choice([5, 10, 15, 30, 45, 60])
-            data_hora = agora + timedelta(minutes=minutos_no_futuro)
-
-            alerta = Alerta.objects.create(
-                tipo_alerta="prescricao",
-                paciente=paciente,
-                prescricao=prescricao,
-                mensagem=msg,
-                data_hora=data_hora,
-                repetir=random.choice([False, False, True]),
-                repetir_intervalo=random.choice(
-                    [choice for choice, _ in Alerta.INTERVALO_CHOICES]
-                ) if random.choice([False, True]) else None,
-                ativo=True,
-            )
-            alertas.append(alerta)
-
-        # 5 alertas do tipo "outro"
-        for i in range(5):
-            paciente = random.choice(pacientes)
-            msg = random.choice(mensagens_outros)
-            minutos_no_futuro = random.choice([10, 20, 30, 60, 120])
-            data_hora = agora + timedelta(minutes=minutos_no_futuro)
-
-            alerta = Alerta.objects.create(
-                tipo_alerta="outro",
-                paciente=paciente,
-                prescricao=None,
-                mensagem=msg,
-                data_hora=data_hora,
-                repetir=False,
-                repetir_intervalo=None,
-                ativo=True,
-            )
-            alertas.append(alerta)
-
-        return alertas
+            for _ in range(self.options["administracoes_por_prescricao"]):
+                # entre a criação da prescrição e agora
+                lote["administracoes"].append(Administracao(
+                    prescricao=prescricao,
+                    usuario=rng.choice(equipe),
+                    data_hora=criada_em + (self.agora - criada_em) * rng.random(),
+                ))
+        lote["prescricoes"].extend(prescricoes)
+
+        for _ in range(self.options["alertas_por_paciente"]):
+            lote["alertas"].append(self._gerar_alerta(paciente, prescricoes))
+
+    def _gerar_alerta(self, paciente, prescricoes):
+        rng = self.rng
+        sorteio = rng.random()
+
+        if sorteio < 0.4:
+            # pontual, disparando nas próximas duas horas
+            data_hora = self.agora + timedelta(minutes=rng.choice([5, 10, 15, 30, 45, 60, 120]))
+            repetir_intervalo = None
+            ativo = True
+        elif sorteio < 0.7:
+            # recorrente, iniciado em algum momento do histórico
+            data_hora = self._momento_historico()
+            repetir_intervalo = rng.choice(INTERVALOS)
+            ativo = rng.random() < 0.9
+        else:
+            # pontual que já passou
+            data_hora = self._momento_historico()
+            repetir_intervalo = None
+            ativo = rng.random() < 0.2
+
+        if prescricoes and rng.random() < 0.7:
+            tipo_alerta = "prescricao"
+            prescricao = rng.choice(prescricoes)
+            mensagem = rng.choice(MENSAGENS_PRESCRICAO)
+        else:
+            tipo_alerta = "outro"
+            prescricao = None
+            mensagem = rng.choice(MENSAGENS_OUTROS)
+
+        repetir = repetir_intervalo is not None
+        criado_em = min(data_hora, self.agora)
+
+        return Alerta(
+            tipo_alerta=tipo_alerta,
+            paciente=paciente,
+            prescricao=prescricao,
+            mensagem=mensagem,
+            data_hora=data_hora,
+            repetir=repetir,
+            repetir_intervalo=repetir_intervalo,
+            ativo=ativo,
+            # bulk_create não passa por Alerta.save()
+            fase_recorrencia=calcular_fase(data_hora, repetir, repetir_intervalo),
+            criado_em=criado_em,
+            atualizado_em=criado_em,
+        )
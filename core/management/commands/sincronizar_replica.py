@@ -0,0 +1,68 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco primário (SQLite) para a réplica de leitura (SQLite) com a "
+        "API de backup do SQLite, que gera uma cópia consistente mesmo com "
+        "escritas em andamento. Serve para testar localmente o roteamento de "
+        "leituras; com PostgreSQL/MySQL use a replicação do próprio servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo", type=float, default=0,
+            help="Repete a cada N segundos até ser interrompido (padrão: copia uma vez).",
+        )
+        parser.add_argument(
+            "--paginas-por-passo", type=int, default=1024,
+            help=(
+                "Páginas copiadas por passo do backup; entre os passos o primário "
+                "fica livre para escritas (padrão: 1024)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA not in connections.settings:
+            raise CommandError(
+                "Nenhuma réplica configurada. Defina DATABASE_REPLICA_URL "
+                "(ex.: sqlite:///db_replica.sqlite3)."
+            )
+
+        primario = connections[DEFAULT_DB_ALIAS]
+        replica = connections[REPLICA]
+        if primario.vendor != "sqlite" or replica.vendor != "sqlite":
+            raise CommandError("sincronizar_replica só funciona com primário e réplica SQLite.")
+
+        origem = str(primario.settings_dict["NAME"])
+        destino = str(replica.settings_dict["NAME"])
+        if origem == destino:
+            raise CommandError("Primário e réplica apontam para o mesmo arquivo.")
+
+        try:
+            while True:
+                self._copiar(origem, destino, options["paginas_por_passo"])
+                if options["intervalo"] <= 0:
+                    break
+                time.sleep(options["intervalo"])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrompido.")
+
+    def _copiar(self, origem, destino, paginas_por_passo):
+        inicio = time.perf_counter()
+        # conexões próprias: o backup não passa pelo ORM nem pelos PRAGMAs do core
+        fonte = sqlite3.connect(origem)
+        alvo = sqlite3.connect(destino, timeout=30)
+        try:
+            fonte.backup(alvo, pages=paginas_por_passo)
+        finally:
+            alvo.close()
+            fonte.close()
+        duracao = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(self.style.SUCCESS(f"✔ Réplica {destino} sincronizada em {duracao:.0f} ms."))
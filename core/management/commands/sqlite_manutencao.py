@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.sqlite import ler_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Manutenção periódica do SQLite em modo WAL: checkpoint do WAL (devolve "
+        "as páginas ao arquivo principal e impede o -wal de crescer sem limite) "
+        "e PRAGMA optimize (atualiza estatísticas do planejador). Rode pelo cron "
+        "ou deixe em execução com --intervalo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default="default",
+            help="Alias do banco (padrão: default).",
+        )
+        parser.add_argument(
+            "--modo", default="PASSIVE",
+            choices=["PASSIVE", "FULL", "RESTART", "TRUNCATE"],
+            help=(
+                "Modo do wal_checkpoint. PASSIVE não espera ninguém; TRUNCATE espera "
+                "os leitores e zera o arquivo -wal (padrão: PASSIVE)."
+            ),
+        )
+        parser.add_argument(
+            "--sem-optimize", action="store_true",
+            help="Só faz o checkpoint.",
+        )
+        parser.add_argument(
+            "--intervalo", type=int, default=0,
+            help="Repete a cada N segundos até ser interrompido (padrão: roda uma vez).",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError(f"O banco '{options['database']}' não é SQLite.")
+
+        try:
+            while True:
+                self._executar(connection, options)
+                if options["intervalo"] <= 0:
+                    break
+                # não segura a conexão (nem o snapshot de leitura) entre as rodadas
+                connection.close()
+                time.sleep(options["intervalo"])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrompido.")
+
+    def _executar(self, connection, options):
+        journal_mode = ler_pragmas(connection, ["journal_mode"])["journal_mode"]
+
+        with connection.cursor() as cursor:
+            if journal_mode == "wal":
+                inicio = time.perf_counter()
+                cursor.execute(f"PRAGMA wal_checkpoint({options['modo']})")
+                ocupado, paginas_wal, paginas_copiadas = cursor.fetchone()
+                duracao = (time.perf_counter() - inicio) * 1000
+                mensagem = (
+                    f"✔ Checkpoint {options['modo']}: {paginas_copiadas}/{paginas_wal} "
+                    f"páginas do WAL copiadas em {duracao:.0f} ms."
+                )
+                if ocupado:
+                    self.stdout.write(self.style.WARNING(
+                        mensagem + " Havia leitores/escritores ativos; o restante fica para a próxima rodada."
+                    ))
+                else:
+                    self.stdout.write(self.style.SUCCESS(mensagem))
+            else:
+                self.stdout.write(f"journal_mode={journal_mode}: sem WAL, checkpoint ignorado.")
+
+            if not options["sem_optimize"]:
+                inicio = time.perf_counter()
+                cursor.execute("PRAGMA optimize")
+                duracao = (time.perf_counter() - inicio) * 1000
+                self.stdout.write(self.style.SUCCESS(f"✔ PRAGMA optimize em {duracao:.0f} ms."))
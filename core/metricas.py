@@ -0,0 +1,267 @@
+"""
+Métricas no formato de exposição de texto do Prometheus (``/metrics``).
+
+Cada processo (worker do gunicorn/uvicorn) acumula em memória, por nome de
+rota, o número de requisições e os histogramas de latência e de consultas
+SQL (alimentados pelo ``MetricasMiddleware``). De tempos em tempos
+(``METRICAS_INTERVALO_GRAVACAO``) o processo grava seu estado num arquivo
+próprio em ``METRICAS_DIRETORIO``; quem atende o ``/metrics`` soma os
+arquivos de todos os processos, então o scrape vê o total da máquina não
+importa qual worker responda.
+
+Os arquivos de processos encerrados continuam sendo somados (contadores do
+Prometheus não podem diminuir). Limpe o diretório ao reiniciar o serviço,
+como no modo multiprocesso do ``prometheus_client``.
+
+Os medidores (alertas ativos, pendentes, prescrições por status) são lidos
+do banco na hora do scrape e não dependem do processo.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .alertas import consultar_pendentes
+from .consultas import contar
+from .models import Alerta, Prescricao
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+PREFIXO = 'cuidemed'
+
+# limites (le) dos histogramas
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+INTERVALO_GRAVACAO = getattr(settings, 'METRICAS_INTERVALO_GRAVACAO', 1.0)
+
+
+def _diretorio():
+    return Path(getattr(settings, 'METRICAS_DIRETORIO', settings.BASE_DIR / '.metricas'))
+
+
+class _Histograma:
+    """Contagens por bucket (não cumulativas), soma e total de observações."""
+
+    __slots__ = ('buckets', 'contagens', 'soma', 'total')
+
+    def __init__(self, buckets, contagens=None, soma=0.0, total=0):
+        self.buckets = buckets
+        self.contagens = contagens or [0] * len(buckets)
+        self.soma = soma
+        self.total = total
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+    def somar(self, outro):
+        self.contagens = [a + b for a, b in zip(self.contagens, outro.contagens)]
+        self.soma += outro.soma
+        self.total += outro.total
+
+    def para_json(self):
+        return [list(self.contagens), self.soma, self.total]
+
+
+class RegistroMetricas:
+    """Estado do processo atual; ``registrar`` é chamado a cada requisição."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reiniciar()
+        atexit.register(self.gravar)
+
+    def _reiniciar(self):
+        # também roda no filho depois de um fork: cada processo conta só o que atendeu
+        self._pid = os.getpid()
+        self._nome_arquivo = f'{self._pid}-{time.time_ns()}.json'
+        self._ultima_gravacao = 0.0
+        self.requisicoes = {}
+        self.duracao = {}
+        self.consultas = {}
+
+    def registrar(self, rota, metodo, status, duracao_segundos, consultas):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reiniciar()
+
+            chave = (rota, metodo, str(status))
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+
+            if rota not in self.duracao:
+                self.duracao[rota] = _Histograma(BUCKETS_DURACAO)
+                self.consultas[rota] = _Histograma(BUCKETS_CONSULTAS)
+            self.duracao[rota].observar(duracao_segundos)
+            self.consultas[rota].observar(consultas)
+
+            gravar = time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO
+
+        if gravar:
+            self.gravar()
+
+    def para_json(self):
+        with self._lock:
+            return {
+                'requisicoes': [[*chave, n] for chave, n in self.requisicoes.items()],
+                'duracao': {rota: h.para_json() for rota, h in self.duracao.items()},
+                'consultas': {rota: h.para_json() for rota, h in self.consultas.items()},
+            }
+
+    def gravar(self):
+        """Grava o estado do processo no seu arquivo (troca atômica)."""
+        if os.getpid() != self._pid or not self.requisicoes:
+            return
+        self._ultima_gravacao = time.monotonic()
+        diretorio = _diretorio()
+        arquivo = diretorio / self._nome_arquivo
+        temporario = arquivo.with_suffix('.tmp')
+        try:
+            diretorio.mkdir(parents=True, exist_ok=True)
+            temporario.write_text(json.dumps(self.para_json()), encoding='utf-8')
+            os.replace(temporario, arquivo)
+        except OSError:
+            # métrica nunca derruba requisição; tenta de novo na próxima gravação
+            pass
+
+    def agregado(self):
+        """Soma o estado deste processo com os arquivos dos demais."""
+        estados = [self.para_json()]
+        diretorio = _diretorio()
+        if diretorio.is_dir():
+            for arquivo in diretorio.glob('*.json'):
+                if arquivo.name == self._nome_arquivo:
+                    continue
+                try:
+                    estados.append(json.loads(arquivo.read_text(encoding='utf-8')))
+                except (OSError, ValueError):
+                    # arquivo sumiu ou está sendo trocado; entra no próximo scrape
+                    continue
+
+        requisicoes = {}
+        duracao = {}
+        consultas = {}
+        for estado in estados:
+            for *chave, n in estado['requisicoes']:
+                chave = tuple(chave)
+                requisicoes[chave] = requisicoes.get(chave, 0) + n
+            for destino, origem, buckets in (
+                (duracao, estado['duracao'], BUCKETS_DURACAO),
+                (consultas, estado['consultas'], BUCKETS_CONSULTAS),
+            ):
+                for rota, dados in origem.items():
+                    histograma = _Histograma(buckets, *dados)
+                    if rota in destino:
+                        destino[rota].somar(histograma)
+                    else:
+                        destino[rota] = histograma
+
+        return requisicoes, duracao, consultas
+
+
+registro = RegistroMetricas()
+
+
+# -----------------------------
+# Exposição
+# -----------------------------
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(**rotulos):
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos.items()) + '}'
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor)
+
+
+def _linhas_histograma(nome, ajuda, histogramas):
+    yield f'# HELP {nome} {ajuda}'
+    yield f'# TYPE {nome} histogram'
+    for rota in sorted(histogramas):
+        histograma = histogramas[rota]
+        acumulado = 0
+        for limite, contagem in zip(histograma.buckets, histograma.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{_rotulos(rota=rota, le=_numero(limite))} {acumulado}'
+        yield f'{nome}_bucket{_rotulos(rota=rota, le="+Inf")} {histograma.total}'
+        yield f'{nome}_sum{_rotulos(rota=rota)} {_numero(histograma.soma)}'
+        yield f'{nome}_count{_rotulos(rota=rota)} {histograma.total}'
+
+
+def _medidores():
+    """Medidores lidos do banco: uma consulta de contagens e a agenda de alertas."""
+    querysets = {'alertas_ativos': Alerta.objects.filter(ativo=True)}
+    for status, _ in Prescricao.STATUS_CHOICES:
+        querysets[f'prescricoes_{status}'] = Prescricao.objects.filter(status=status)
+    contagens = contar(**querysets)
+    pendentes = len(consultar_pendentes(timezone.now()))
+    return contagens, pendentes
+
+
+def gerar_exposicao():
+    requisicoes, duracao, consultas = registro.agregado()
+    contagens, pendentes = _medidores()
+
+    linhas = [
+        f'# HELP {PREFIXO}_requisicoes_total Requisições atendidas, por rota, método e status.',
+        f'# TYPE {PREFIXO}_requisicoes_total counter',
+    ]
+    for (rota, metodo, status), n in sorted(requisicoes.items()):
+        linhas.append(f'{PREFIXO}_requisicoes_total{_rotulos(rota=rota, metodo=metodo, status=status)} {n}')
+
+    linhas.extend(_linhas_histograma(
+        f'{PREFIXO}_requisicao_duracao_segundos',
+        'Tempo de resposta por rota, em segundos.',
+        duracao,
+    ))
+    linhas.extend(_linhas_histograma(
+        f'{PREFIXO}_requisicao_consultas',
+        'Consultas SQL por requisição, por rota.',
+        consultas,
+    ))
+
+    linhas.extend([
+        f'# HELP {PREFIXO}_alertas_ativos Alertas com ativo=True.',
+        f'# TYPE {PREFIXO}_alertas_ativos gauge',
+        f'{PREFIXO}_alertas_ativos {contagens["alertas_ativos"]}',
+        f'# HELP {PREFIXO}_alertas_pendentes Ocorrências de alertas na janela de pendentes (próximos 5 minutos).',
+        f'# TYPE {PREFIXO}_alertas_pendentes gauge',
+        f'{PREFIXO}_alertas_pendentes {pendentes}',
+        f'# HELP {PREFIXO}_prescricoes Prescrições por status.',
+        f'# TYPE {PREFIXO}_prescricoes gauge',
+    ])
+    for status, _ in Prescricao.STATUS_CHOICES:
+        linhas.append(f'{PREFIXO}_prescricoes{_rotulos(status=status)} {contagens[f"prescricoes_{status}"]}')
+
+    return '\n'.join(linhas) + '\n'
+
+
+def metricas(request):
+    """
+    ``/metrics`` para o Prometheus. Exige ``Authorization: Bearer <token>``
+    com o ``METRICAS_TOKEN`` (configurar em ``authorization`` no
+    ``scrape_config``); sem token configurado só responde com ``DEBUG``.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(gerar_exposicao(), content_type=CONTENT_TYPE)
@@ -0,0 +1,208 @@
+import cProfile
+import logging
+import os
+import random
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metricas import registro
+from .perfil import ativar_contagem_sql, encerrar_medicao, iniciar_medicao, medicao_atual, medir
+
+logger = logging.getLogger(__name__)
+
+
+class PerfilRequisicaoMiddleware:
+    """
+    Mede cada requisição e devolve o resultado no cabeçalho ``Server-Timing``
+    (aba Network/Timing do navegador)::
+
+        Server-Timing: total;dur=41.2, sql;dur=6.3;desc="4 consultas", render;dur=12.8, serializacao;dur=9.1
+
+    - ``total``: tempo da requisição dentro do Django;
+    - ``sql``: tempo e quantidade de consultas, em todas as conexões;
+    - ``render``: renderização de ``TemplateResponse`` (templates HTML e
+      renderizadores do DRF), sem o SQL disparado pelo template;
+    - ``serializacao``: trechos marcados com ``core.perfil.medir`` nas views
+      da API, sem o SQL.
+
+    Com ``PERFIL_CPROFILE_LIMIAR_MS`` definido, uma fração
+    (``PERFIL_CPROFILE_AMOSTRAGEM``) das requisições roda sob o cProfile e,
+    se passar do limiar, o perfil é gravado em ``PERFIL_CPROFILE_DIRETORIO``
+    (abrir com ``python -m pstats`` ou snakeviz).
+
+    Com ``PERFIL_REQUISICOES_ATIVO = False`` o middleware se retira da pilha
+    na inicialização (``MiddlewareNotUsed``) e não custa nada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFIL_REQUISICOES_ATIVO', False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.limiar_ms = getattr(settings, 'PERFIL_CPROFILE_LIMIAR_MS', None)
+        self.amostragem = getattr(settings, 'PERFIL_CPROFILE_AMOSTRAGEM', 0.1)
+        self.diretorio = Path(getattr(settings, 'PERFIL_CPROFILE_DIRETORIO', settings.BASE_DIR / 'perfis'))
+
+        ativar_contagem_sql()
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        medicao, token = iniciar_medicao()
+        perfil = self._iniciar_perfil()
+        try:
+            response = self.get_response(request)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            encerrar_medicao(token)
+        return self._finalizar(request, response, medicao, perfil)
+
+    async def __acall__(self, request):
+        medicao, token = iniciar_medicao()
+        # o cProfile só enxerga a thread atual; em views async o perfil sai parcial
+        perfil = self._iniciar_perfil()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            encerrar_medicao(token)
+        return self._finalizar(request, response, medicao, perfil)
+
+    def process_template_response(self, request, response):
+        # o handler chama response.render() logo depois deste hook
+        renderizar = response.render
+
+        def render():
+            with medir('render'):
+                return renderizar()
+
+        response.render = render
+        return response
+
+    # -----------------------------
+    # Helpers
+    # -----------------------------
+
+    def _iniciar_perfil(self):
+        if self.limiar_ms is None or random.random() >= self.amostragem:
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # outro profiler já ativo (ex.: depurador)
+            return None
+        return perfil
+
+    def _finalizar(self, request, response, medicao, perfil):
+        total_ms = medicao.total_ms()
+
+        partes = [
+            f'total;dur={total_ms:.1f}',
+            f'sql;dur={medicao.sql_ms:.1f};desc="{medicao.sql_consultas} consultas"',
+        ]
+        partes.extend(f'{nome};dur={ms:.1f}' for nome, ms in medicao.trechos.items())
+        response['Server-Timing'] = ', '.join(partes)
+
+        if perfil is not None and total_ms >= self.limiar_ms:
+            self._gravar_perfil(request, perfil, total_ms)
+
+        return response
+
+    def _gravar_perfil(self, request, perfil, total_ms):
+        match = getattr(request, 'resolver_match', None)
+        rota = (match.url_name if match else None) or 'sem_rota'
+        nome = f"{datetime.now():%Y%m%d-%H%M%S}-{rota}-{total_ms:.0f}ms-{os.getpid()}.prof"
+
+        try:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            perfil.dump_stats(self.diretorio / nome)
+        except OSError:
+            logger.exception("Não foi possível gravar o perfil de %s", request.path)
+            return
+
+        logger.warning(
+            "Requisição lenta: %s %s levou %.0f ms; perfil em %s",
+            request.method, request.path, total_ms, self.diretorio / nome,
+        )
+
+
+class MetricasMiddleware:
+    """
+    Alimenta ``core.metricas.registro`` com a rota (``url_name``), o status,
+    a duração e o número de consultas de cada requisição. Rotas sem nome ou
+    inexistentes (404) entram como ``sem_rota`` para não explodir o número
+    de séries.
+
+    Reaproveita a medição do ``PerfilRequisicaoMiddleware`` quando ele está
+    ativo; senão abre a sua. ``METRICAS_ATIVO = False`` tira o middleware da
+    pilha.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_ATIVO', False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        ativar_contagem_sql()
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        medicao, token = self._abrir()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                encerrar_medicao(token)
+        self._registrar(request, response, medicao)
+        return response
+
+    async def __acall__(self, request):
+        medicao, token = self._abrir()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                encerrar_medicao(token)
+        self._registrar(request, response, medicao)
+        return response
+
+    def _abrir(self):
+        medicao = medicao_atual()
+        if medicao is not None:
+            return medicao, None
+        return iniciar_medicao()
+
+    def _registrar(self, request, response, medicao):
+        match = getattr(request, 'resolver_match', None)
+        rota = (match.url_name if match else None) or 'sem_rota'
+        registro.registrar(
+            rota,
+            request.method,
+            response.status_code,
+            medicao.total_ms() / 1000,
+            medicao.sql_consultas,
+        )
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:23
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+# congelado aqui: a migração não pode mudar junto com core.recorrencia
+PASSOS_SEGUNDOS = {
+    '4h': 4 * 3600,
+    '6h': 6 * 3600,
+    '8h': 8 * 3600,
+    '12h': 12 * 3600,
+    '24h': 24 * 3600,
+    'semanal': 7 * 24 * 3600,
+}
+
+EPOCA = datetime(1970, 1, 1)
+
+
+def calcular_fase(data_hora, repetir_intervalo):
+    passo = PASSOS_SEGUNDOS.get(repetir_intervalo)
+    if passo is None or data_hora is None:
+        return None
+    if data_hora.tzinfo is not None:
+        data_hora = data_hora.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((data_hora - EPOCA).total_seconds() // 1) % passo
+
+
+def preencher_fase(apps, schema_editor):
+    Alerta = apps.get_model('core', 'Alerta')
+    for alerta in Alerta.objects.filter(repetir=True).only('data_hora', 'repetir_intervalo'):
+        alerta.fase_recorrencia = calcular_fase(alerta.data_hora, alerta.repetir_intervalo)
+        alerta.save(update_fields=['fase_recorrencia'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_remove_alerta_dia_semana_remove_alerta_fim_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerta',
+            name='fase_recorrencia',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='alerta',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['data_hora'], name='alerta_ativo_data_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerta',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['repetir_intervalo', 'fase_recorrencia'], name='alerta_recorrencia_idx'),
+        ),
+        migrations.RunPython(preencher_fase, migrations.RunPython.noop),
+    ]
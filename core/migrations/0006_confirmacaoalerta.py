@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alerta_fase_recorrencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmacaoAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_hora', models.DateTimeField()),
+                ('confirmado_em', models.DateTimeField(auto_now_add=True)),
+                ('alerta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='confirmacoes', to='core.alerta')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='confirmacoes_alerta', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Confirmação de alerta',
+                'verbose_name_plural': 'Confirmações de alertas',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'data_hora', 'alerta'), name='confirmacao_alerta_unica')],
+            },
+        ),
+    ]
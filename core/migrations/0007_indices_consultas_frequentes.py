@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:04
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_confirmacaoalerta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='administracao',
+            index=models.Index(fields=['data_hora', 'id'], name='administracao_data_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='administracao',
+            index=models.Index(fields=['prescricao', 'data_hora'], name='administracao_prescricao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerta',
+            index=models.Index(fields=['data_hora', 'id'], name='alerta_data_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['nome', 'id'], name='paciente_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(django.db.models.functions.text.Upper('nome'), name='paciente_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescricao',
+            index=models.Index(fields=['data_criacao', 'id'], name='prescricao_data_criacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescricao',
+            index=models.Index(fields=['paciente', 'status'], name='prescricao_paciente_status_idx'),
+        ),
+        # os índices compostos cobrem as chaves estrangeiras: só depois de
+        # criá-los o índice próprio de cada FK sai
+        migrations.AlterField(
+            model_name='administracao',
+            name='prescricao',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.prescricao'),
+        ),
+        migrations.AlterField(
+            model_name='prescricao',
+            name='paciente',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.paciente'),
+        ),
+    ]
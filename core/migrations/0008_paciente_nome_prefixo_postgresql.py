@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Só no PostgreSQL: o LIKE 'termo%' da busca por nome (core.consultas.Prefixo)
+# só usa índice B-tree com text_pattern_ops quando a colação não é "C". Nos
+# outros bancos a busca usa o índice paciente_nome_busca_idx.
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS paciente_nome_prefixo_idx '
+            'ON core_paciente (UPPER(nome) text_pattern_ops)'
+        )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS paciente_nome_prefixo_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_consultas_frequentes'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+from django.db import migrations, models
+
+
+def preencher_nome_busca(apps, schema_editor):
+    Paciente = apps.get_model('core', 'Paciente')
+    pacientes = list(Paciente.objects.only('nome'))
+    for paciente in pacientes:
+        # congelado aqui, como core.consultas.normalizar_busca hoje
+        paciente.nome_busca = paciente.nome.upper()
+    Paciente.objects.bulk_update(pacientes, ['nome_busca'], batch_size=500)
+
+
+# a busca deixou de filtrar por prefixo de UPPER(nome): o índice da 0008
+# (só PostgreSQL) não serve mais
+
+def remover_indice_prefixo(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS paciente_nome_prefixo_idx')
+
+
+def criar_indice_prefixo(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS paciente_nome_prefixo_idx '
+            'ON core_paciente (UPPER(nome) text_pattern_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_paciente_nome_prefixo_postgresql'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='paciente',
+            name='paciente_nome_busca_idx',
+        ),
+        migrations.RunPython(remover_indice_prefixo, criar_indice_prefixo),
+        migrations.AddField(
+            model_name='paciente',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+    ]
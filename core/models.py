@@ -3,6 +3,9 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from .consultas import normalizar_busca
+from .recorrencia import calcular_fase
+
 
 class Usuario(AbstractUser):
     USERNAME_FIELD = 'username'
@@ -55,14 +58,24 @@ class Paciente(models.Model):
     telefone_contato = models.CharField(max_length=20, blank=True, null=True)
     alergias = models.TextField(blank=True, null=True)
     historico_clinico = models.TextField(blank=True, null=True)
+    # nome normalizado para a busca (core.consultas.normalizar_busca)
+    nome_busca = models.CharField(max_length=255, default='', editable=False)
 
     class Meta:
         verbose_name = "Paciente"
         verbose_name_plural = "Pacientes"
+        indexes = [
+            # listagem ordenada por nome
+            models.Index(fields=['nome', 'id'], name='paciente_nome_idx'),
+        ]
 
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        self.nome_busca = normalizar_busca(self.nome)
+        super().save(*args, **kwargs)
+
 
 class Medicamento(models.Model):
     nome = models.CharField(max_length=255)
@@ -84,7 +97,11 @@ class Prescricao(models.Model):
         ('encerrada', 'Encerrada'),
     ]
 
-    paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE)
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        db_index=False,  # coberto pelo índice (paciente, status)
+    )
     medicamento = models.ForeignKey(Medicamento, on_delete=models.CASCADE)
 
     medico = models.ForeignKey(
@@ -112,6 +129,13 @@ class Prescricao(models.Model):
     class Meta:
         verbose_name = "Prescrição"
         verbose_name_plural = "Prescrições"
+        indexes = [
+            # listagens mais recentes primeiro e prescrições do dia no dashboard
+            # (o id desempata a ordenação da API)
+            models.Index(fields=['data_criacao', 'id'], name='prescricao_data_criacao_idx'),
+            # prescrições de um paciente, em geral só as ativas
+            models.Index(fields=['paciente', 'status'], name='prescricao_paciente_status_idx'),
+        ]
 
     def __str__(self):
         return f"Prescrição para {self.paciente.nome} - {self.medicamento.nome}"
@@ -126,13 +150,23 @@ class Prescricao(models.Model):
 
 
 class Administracao(models.Model):
-    prescricao = models.ForeignKey(Prescricao, on_delete=models.CASCADE)
+    prescricao = models.ForeignKey(
+        Prescricao,
+        on_delete=models.CASCADE,
+        db_index=False,  # coberto pelo índice (prescricao, data_hora)
+    )
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
     data_hora = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Administração"
         verbose_name_plural = "Administrações"
+        indexes = [
+            # listagem/período e próximas administrações do dashboard
+            models.Index(fields=['data_hora', 'id'], name='administracao_data_hora_idx'),
+            # histórico (e última administração) de cada prescrição
+            models.Index(fields=['prescricao', 'data_hora'], name='administracao_prescricao_idx'),
+        ]
 
     def __str__(self):
         return f"Administração de {self.prescricao.medicamento.nome} por {self.usuario.username}"
@@ -188,14 +222,76 @@ class Alerta(models.Model):
 
     ativo = models.BooleanField(default=True)
 
+    # segundos desde a época módulo o passo de repetição (ver core.recorrencia);
+    # nulo para alertas pontuais
+    fase_recorrencia = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Alerta"
         verbose_name_plural = "Alertas"
+        indexes = [
+            # listagem de alertas (ativos e inativos) ordenada por horário
+            models.Index(fields=['data_hora', 'id'], name='alerta_data_hora_idx'),
+            # usados pelo motor de ocorrências (core.recorrencia.filtro_ocorrencias)
+            # (índices parciais: só alertas ativos)
+            models.Index(
+                fields=['data_hora'],
+                name='alerta_ativo_data_hora_idx',
+                condition=models.Q(ativo=True),
+            ),
+            models.Index(
+                fields=['repetir_intervalo', 'fase_recorrencia'],
+                name='alerta_recorrencia_idx',
+                condition=models.Q(ativo=True),
+            ),
+        ]
 
     def __str__(self):
         if self.tipo_alerta == 'prescricao' and self.prescricao:
             return f"Alerta de prescrição ({self.prescricao})"
         return f"Alerta para {self.paciente.nome}"
+
+    def save(self, *args, **kwargs):
+        self.fase_recorrencia = calcular_fase(self.data_hora, self.repetir, self.repetir_intervalo)
+        super().save(*args, **kwargs)
+
+
+class ConfirmacaoAlerta(models.Model):
+    """
+    Ocorrência de um alerta confirmada por um usuário no modal de pendentes;
+    a API de pendentes deixa de mostrá-la a esse usuário.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='confirmacoes_alerta',
+        db_index=False,  # coberto pela restrição única (usuario, data_hora, alerta)
+    )
+    alerta = models.ForeignKey(
+        Alerta,
+        on_delete=models.CASCADE,
+        related_name='confirmacoes',
+    )
+
+    # horário da ocorrência confirmada (nos alertas recorrentes difere de
+    # alerta.data_hora)
+    data_hora = models.DateTimeField()
+
+    confirmado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Confirmação de alerta"
+        verbose_name_plural = "Confirmações de alertas"
+        constraints = [
+            # a ordem serve à consulta da API de pendentes: usuário + janela
+            models.UniqueConstraint(
+                fields=['usuario', 'data_hora', 'alerta'],
+                name='confirmacao_alerta_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario} confirmou {self.alerta_id} em {self.data_hora:%d/%m %H:%M}"
@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacao(CursorPagination):
+    """
+    Paginação por cursor (keyset) para todas as ViewSets.
+
+    O cursor guarda o valor do *primeiro* campo de ``ordering`` na borda da
+    página e vira um ``WHERE campo > valor`` (ou ``<``) sobre ele, então a
+    página 1000 custa o mesmo que a primeira. Não é uma chave composta: o
+    ``CursorPagination`` do DRF resolve empates nesse campo com um
+    deslocamento (``OFFSET``) dentro do grupo empatado, que só cresce com o
+    tamanho do grupo.
+
+    Cada ViewSet declara a ordenação em ``ordering`` (ex.:
+    ``('-data_hora', '-id')``); o ``id`` no fim não entra no cursor, mas
+    deixa a ordem dentro de um empate determinística, o que o deslocamento
+    precisa para não repetir nem pular registros.
+
+    O cliente pode pedir ``?page_size=N`` até ``API_MAX_PAGE_SIZE``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+    ordering = ('id',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,97 @@
+"""
+Medição por requisição usada pelo ``PerfilRequisicaoMiddleware``.
+
+O middleware abre uma ``Medicao`` no início da requisição e a deixa numa
+``ContextVar``; quem quiser medir um trecho (renderização, serialização) usa
+``medir('nome')``. Fora de uma requisição medida, ``medir`` não faz nada além
+de ler a ``ContextVar``, então pode ficar no código sem custo.
+
+O tempo de SQL é acumulado à parte por ``executar_sql``, um
+``execute_wrapper`` instalado uma vez em cada conexão, e descontado dos
+trechos: ``medir('serializacao')`` mostra só o tempo de Python, mesmo que a
+serialização dispare consultas (querysets preguiçosos, relações).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_medicao_atual = ContextVar('medicao_requisicao', default=None)
+
+
+class Medicao:
+
+    __slots__ = ('inicio', 'sql_consultas', 'sql_ms', 'trechos')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sql_consultas = 0
+        self.sql_ms = 0.0
+        self.trechos = {}
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+def executar_sql(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` das conexões: conta consultas e soma o tempo na
+    medição da requisição corrente. A ``ContextVar`` acompanha a requisição
+    até a thread do ``sync_to_async``, onde ficam as conexões das views
+    síncronas servidas por ASGI.
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.sql_ms += (time.perf_counter() - inicio) * 1000
+        medicao.sql_consultas += 1
+
+
+def instalar_em_conexao(connection, **kwargs):
+    """Receptor de ``connection_created``; cada conexão recebe o wrapper uma vez."""
+    if executar_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(executar_sql)
+
+
+def ativar_contagem_sql():
+    """Instala ``executar_sql`` nas conexões já abertas e nas que vierem."""
+    connection_created.connect(instalar_em_conexao, dispatch_uid='perfil_requisicao_sql')
+    for conexao in connections.all(initialized_only=True):
+        instalar_em_conexao(conexao)
+
+
+def medicao_atual():
+    return _medicao_atual.get()
+
+
+def iniciar_medicao():
+    medicao = Medicao()
+    return medicao, _medicao_atual.set(medicao)
+
+
+def encerrar_medicao(token):
+    _medicao_atual.reset(token)
+
+
+@contextmanager
+def medir(nome):
+    """Soma em ``nome`` o tempo do bloco, sem o SQL executado dentro dele."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    sql_antes = medicao.sql_ms
+    try:
+        yield
+    finally:
+        decorrido = (time.perf_counter() - inicio) * 1000 - (medicao.sql_ms - sql_antes)
+        medicao.trechos[nome] = medicao.trechos.get(nome, 0.0) + decorrido
@@ -0,0 +1,132 @@
+"""
+Motor de ocorrências de alertas recorrentes (``repetir``/``repetir_intervalo``).
+
+Um alerta recorrente dispara em ``data_hora + k * passo`` (k = 0, 1, 2, ...).
+Como todos os intervalos são passos fixos, cada alerta guarda a sua *fase*:
+os segundos desde a época módulo o passo (``Alerta.fase_recorrencia``).
+Uma ocorrência cai numa janela ``[inicio, fim]`` só se a fase do alerta cair
+na faixa ``[inicio % passo, fim % passo]`` (com volta pelo zero), o que vira
+uma condição de intervalo sobre o índice parcial (só ativos)
+``(repetir_intervalo, fase_recorrencia)``. A conferência exata é feita
+depois, em aritmética.
+
+Nada aqui materializa séries inteiras: as ocorrências saem de geradores.
+"""
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+PASSOS = {
+    '4h': timedelta(hours=4),
+    '6h': timedelta(hours=6),
+    '8h': timedelta(hours=8),
+    '12h': timedelta(hours=12),
+    '24h': timedelta(hours=24),
+    'semanal': timedelta(weeks=1),
+}
+
+_EPOCA = datetime(1970, 1, 1)
+
+Ocorrencia = namedtuple('Ocorrencia', ['data_hora', 'alerta'])
+
+
+def _segundos(momento):
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return int((momento - _EPOCA).total_seconds() // 1)
+
+
+def obter_passo(repetir, repetir_intervalo):
+    if not repetir:
+        return None
+    return PASSOS.get(repetir_intervalo)
+
+
+def calcular_fase(data_hora, repetir, repetir_intervalo):
+    """Fase (em segundos) do alerta dentro do seu passo; None se não repete."""
+    passo = obter_passo(repetir, repetir_intervalo)
+    if passo is None or data_hora is None:
+        return None
+    return _segundos(data_hora) % int(passo.total_seconds())
+
+
+def filtro_ocorrencias(inicio, fim):
+    """
+    ``Q`` que seleciona os alertas ativos com alguma ocorrência em
+    ``[inicio, fim]`` (pode trazer alguns a mais na borda do segundo;
+    ``ocorrencias_do_alerta`` faz a conferência exata).
+
+    Cada ramo do OR repete ``ativo=True`` (condição dos índices parciais) e
+    começa pelas colunas de um índice, para que o banco resolva tudo com
+    buscas por índice (no SQLite, "MULTI-INDEX OR") em vez de varrer a tabela.
+    """
+    # alertas pontuais: o próprio data_hora
+    filtro = Q(ativo=True, fase_recorrencia__isnull=True, data_hora__gte=inicio, data_hora__lte=fim)
+
+    seg_inicio = _segundos(inicio)
+    seg_fim = _segundos(fim)
+
+    for intervalo, passo in PASSOS.items():
+        passo_seg = int(passo.total_seconds())
+        base = Q(ativo=True, repetir_intervalo=intervalo, data_hora__lte=fim)
+
+        if seg_fim - seg_inicio >= passo_seg:
+            # janela maior que o passo: todo alerta já iniciado dispara
+            filtro |= base & Q(fase_recorrencia__isnull=False)
+            continue
+
+        fase_inicio = seg_inicio % passo_seg
+        fase_fim = seg_fim % passo_seg
+        if fase_inicio <= fase_fim:
+            filtro |= base & Q(fase_recorrencia__gte=fase_inicio, fase_recorrencia__lte=fase_fim)
+        else:
+            # a janela passa pelo zero do passo
+            filtro |= base & Q(fase_recorrencia__gte=fase_inicio)
+            filtro |= base & Q(fase_recorrencia__lte=fase_fim)
+
+    return filtro
+
+
+def ocorrencias_do_alerta(alerta, inicio, fim=None):
+    """
+    Gera, em ordem, os horários de disparo do alerta a partir de ``inicio``
+    (inclusive) até ``fim`` (inclusive). Sem ``fim`` a série é infinita para
+    alertas recorrentes; quem consome decide quando parar.
+    """
+    passo = obter_passo(alerta.repetir, alerta.repetir_intervalo)
+
+    if passo is None:
+        if alerta.data_hora >= inicio and (fim is None or alerta.data_hora <= fim):
+            yield alerta.data_hora
+        return
+
+    momento = alerta.data_hora
+    if momento < inicio:
+        # arredonda para cima o número de passos até chegar em inicio
+        momento += passo * -((alerta.data_hora - inicio) // passo)
+
+    while fim is None or momento <= fim:
+        yield momento
+        momento += passo
+
+
+def proxima_ocorrencia(alerta, apos):
+    """Primeiro disparo em ``apos`` ou depois dele; None se já passou."""
+    return next(ocorrencias_do_alerta(alerta, apos), None)
+
+
+def ocorrencias(queryset, inicio, fim):
+    """
+    Ocorrências ``(data_hora, alerta)`` de todos os alertas do queryset em
+    ``[inicio, fim]``, em ordem de horário. Faz uma única consulta.
+    """
+    alertas = queryset.filter(filtro_ocorrencias(inicio, fim))
+    series = [_serie(alerta, inicio, fim) for alerta in alertas]
+    return heapq.merge(*series, key=lambda o: (o.data_hora, o.alerta.id))
+
+
+def _serie(alerta, inicio, fim):
+    for momento in ocorrencias_do_alerta(alerta, inicio, fim):
+        yield Ocorrencia(momento, alerta)
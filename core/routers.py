@@ -0,0 +1,125 @@
+"""
+Roteamento de leituras para a réplica.
+
+Com ``DATABASES['replica']`` configurado (``DATABASE_REPLICA_URL``), as
+leituras dos modelos do ``core`` vão para a réplica e as escritas para o
+primário (``default``). Continuam no primário:
+
+- qualquer requisição que não seja GET/HEAD/OPTIONS (quem grava relê o que
+  gravou, ex.: validação de formulário e resposta do POST da API);
+- as requisições da mesma sessão nos ``REPLICA_PRIMARIO_APOS_ESCRITA``
+  segundos seguintes a uma escrita, para o redirect depois do POST não
+  mostrar a lista sem o registro novo enquanto a réplica não alcança;
+- leituras dentro de ``transaction.atomic()`` no primário;
+- objetos relacionados de uma instância lida do primário.
+
+O estado "primário nesta requisição" fica numa ``ContextVar`` ligada pelo
+``PrimarioAposEscritaMiddleware``. Sem réplica configurada o roteador não
+interfere em nada.
+"""
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+# chave na sessão: até quando (time.time()) ler do primário
+CHAVE_SESSAO = 'primario_ate'
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+_usar_primario = ContextVar('usar_primario', default=False)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'core' or not replica_configurada():
+            return None
+
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db:
+            return instancia._state.db
+
+        if _usar_primario.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # réplica e primário têm os mesmos dados
+        bancos = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # a réplica recebe o esquema junto com os dados (replicação / sincronizar_replica)
+        if db == REPLICA:
+            return False
+        return None
+
+
+class PrimarioAposEscritaMiddleware:
+    """
+    Prende a requisição no primário quando ela grava ou quando a sessão
+    gravou há pouco. Precisa vir depois do ``SessionMiddleware``.
+
+    Nativo nos dois modos: sob ASGI não custa as duas idas à thread síncrona
+    de um ``MiddlewareMixin``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.janela = getattr(settings, 'REPLICA_PRIMARIO_APOS_ESCRITA', 5)
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_configurada():
+            return self.get_response(request)
+
+        escrita = request.method not in METODOS_SEGUROS
+        if escrita:
+            # vale para esta requisição e para as próximas da sessão
+            request.session[CHAVE_SESSAO] = time.time() + self.janela
+
+        token = _usar_primario.set(self._usar_primario(escrita, request.session.get(CHAVE_SESSAO)))
+        try:
+            return self.get_response(request)
+        finally:
+            # a thread do worker atende outras requisições depois desta
+            _usar_primario.reset(token)
+
+    async def __acall__(self, request):
+        if not replica_configurada():
+            return await self.get_response(request)
+
+        escrita = request.method not in METODOS_SEGUROS
+        if escrita:
+            await request.session.aset(CHAVE_SESSAO, time.time() + self.janela)
+
+        token = _usar_primario.set(self._usar_primario(escrita, await request.session.aget(CHAVE_SESSAO)))
+        try:
+            return await self.get_response(request)
+        finally:
+            _usar_primario.reset(token)
+
+    def _usar_primario(self, escrita, primario_ate):
+        return escrita or (primario_ate is not None and primario_ate > time.time())
@@ -1,4 +1,13 @@
-from rest_framework import serializers
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+from .administracoes import LOTE_MAXIMO
+from .alertas import ler_chave_ocorrencia
 from .models import Usuario, Paciente, Medicamento, Prescricao, Administracao, Alerta
 
 
@@ -11,7 +20,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
 class PacienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Paciente
-        fields = "__all__"
+        exclude = ["nome_busca"]  # cópia do nome só para a busca (core.consultas.normalizar_busca)
 
 
 class MedicamentoSerializer(serializers.ModelSerializer):
@@ -53,3 +62,172 @@ class AlertaSerializer(serializers.ModelSerializer):
         if obj.prescricao and obj.prescricao.medicamento:
             return obj.prescricao.medicamento.nome
         return None
+
+
+# -----------------------------
+# Listagens (leitura)
+# -----------------------------
+
+# campos cujo to_representation devolve o valor do banco como veio
+_SEM_CONVERSAO = (
+    serializers.ReadOnlyField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.BooleanField,
+    serializers.IntegerField,
+    PrimaryKeyRelatedField,
+)
+
+
+def _conversao(campo):
+    """Função aplicada ao valor do banco (``None``: usa como está)."""
+    tipo = type(campo)
+    if tipo in _SEM_CONVERSAO:
+        return None
+    if tipo is serializers.BigIntegerField and not getattr(
+        campo, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING
+    ):
+        return None
+    if (
+        tipo is serializers.DateTimeField
+        and not settings.USE_TZ
+        and not hasattr(campo, 'timezone')
+        and getattr(campo, 'format', api_settings.DATETIME_FORMAT) == ISO_8601
+    ):
+        # sem fuso o DRF só chama isoformat(); o to_representation completo
+        # custava metade do tempo da listagem
+        return datetime.isoformat
+    return campo.to_representation
+
+
+class SerializadorLista:
+    """
+    Caminho rápido das listagens da API: lê só as colunas necessárias com
+    ``values()`` e monta os dicts direto, sem instanciar modelos nem passar
+    cada valor pelos campos do DRF.
+
+    Os campos, a ordem e o formato saem do ``ModelSerializer`` (que continua
+    servindo escrita e detalhe), então o JSON é o mesmo: datas passam pelo
+    ``to_representation`` do campo e, como no DRF, campos com ``source``
+    pontilhado somem quando a relação no meio do caminho é nula. Campos que
+    não são colunas (métodos do modelo, ``SerializerMethodField``) precisam
+    de ``especiais={nome: (lookup, funcao)}``, onde ``funcao`` recebe o
+    valor do ``lookup`` (ou ``None`` para usar o valor como está).
+    """
+
+    def __init__(self, serializer_class, especiais=None):
+        self.serializer_class = serializer_class
+        self.especiais = especiais or {}
+        self._campos = None
+
+    @property
+    def campos(self):
+        # montado no primeiro uso: os campos do serializer dependem dos apps carregados
+        if self._campos is None:
+            self._campos = self._montar()
+        return self._campos
+
+    def _montar(self):
+        modelo = self.serializer_class.Meta.model
+        campos = []
+        for nome, campo in self.serializer_class().fields.items():
+            if nome in self.especiais:
+                lookup, funcao = self.especiais[nome]
+                campos.append((nome, lookup, funcao, ()))
+                continue
+
+            partes = campo.source.split('.')
+            # relações anuláveis no caminho: sem elas o DRF omite o campo
+            checar = []
+            atual = modelo
+            try:
+                for i, parte in enumerate(partes[:-1]):
+                    relacao = atual._meta.get_field(parte)
+                    if relacao.null:
+                        checar.append('__'.join(partes[:i + 1]))
+                    atual = relacao.related_model
+                atual._meta.get_field(partes[-1])
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{nome}: '{campo.source}' não é coluna; "
+                    f"declare-o em especiais."
+                )
+
+            lookup = '__'.join(partes)
+            campos.append((nome, lookup, _conversao(campo), tuple(checar)))
+        return campos
+
+    def selecionar(self, nomes):
+        """Os ``campos`` com esses nomes (``None``: todos)."""
+        if nomes is None:
+            return self.campos
+        return [campo for campo in self.campos if campo[0] in nomes]
+
+    def valores(self, queryset, campos=None, extras=()):
+        """
+        ``queryset.values()`` só com as colunas de ``campos`` (padrão: todos)
+        e ``extras`` (ex.: a ordenação que a paginação por cursor lê).
+        """
+        campos = self.campos if campos is None else campos
+        lookups = {lookup for _, lookup, _, _ in campos}
+        lookups.update(c for _, _, _, checar in campos for c in checar)
+        lookups.update(extras)
+        return queryset.values(*lookups)
+
+    def serializar(self, linhas, campos=None):
+        campos = self.campos if campos is None else campos
+        resultado = []
+        for linha in linhas:
+            item = {}
+            for nome, lookup, funcao, checar in campos:
+                if checar and any(linha[c] is None for c in checar):
+                    continue
+                valor = linha[lookup]
+                item[nome] = valor if funcao is None or valor is None else funcao(valor)
+            resultado.append(item)
+        return resultado
+
+
+lista_prescricoes = SerializadorLista(PrescricaoSerializer)
+
+lista_administracoes = SerializadorLista(AdministracaoSerializer)
+
+_rotulos_tipo_alerta = dict(Alerta.TIPO_ALERTA_CHOICES)
+
+lista_alertas = SerializadorLista(
+    AlertaSerializer,
+    especiais={
+        'tipo_alerta_display': ('tipo_alerta', lambda tipo: _rotulos_tipo_alerta.get(tipo, tipo)),
+        'medicamento_nome': ('prescricao__medicamento__nome', None),
+    },
+)
+
+
+class ConfirmacaoAlertaLoteSerializer(serializers.Serializer):
+    """Lote de ocorrências confirmadas: ``{"ocorrencias": ["<id>@<data_hora ISO>", ...]}``."""
+    ocorrencias = serializers.ListField(
+        child=serializers.CharField(max_length=64),
+        allow_empty=False,
+        max_length=500,
+    )
+
+    def validate_ocorrencias(self, value):
+        try:
+            pares = {ler_chave_ocorrencia(chave) for chave in value}
+        except ValueError:
+            raise serializers.ValidationError('Use o formato "<id>@<data_hora ISO>".')
+
+        # alerta excluído depois de aparecer no modal: não há o que confirmar
+        existentes = set(
+            Alerta.objects.filter(pk__in={alerta_id for alerta_id, _ in pares}).values_list('id', flat=True)
+        )
+        return sorted((alerta_id, data_hora) for alerta_id, data_hora in pares if alerta_id in existentes)
+
+
+class AdministracaoLoteSerializer(serializers.Serializer):
+    """Doses de uma ronda: ``{"prescricoes": [<id>, ...]}``, uma administração por id."""
+    prescricoes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=LOTE_MAXIMO,
+    )
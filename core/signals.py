@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .agenda import agenda
+from .catalogos import medicamentos
+from .models import Administracao, Alerta, Medicamento, Paciente, Prescricao, Usuario
+from .sqlite import aplicar_pragmas
+from .versoes import incrementar_versao
+
+
+@receiver(connection_created)
+def conexao_criada(sender, connection, **kwargs):
+    aplicar_pragmas(connection)
+
+
+@receiver(post_save, sender=Alerta)
+@receiver(post_delete, sender=Alerta)
+def alerta_alterado(sender, instance, **kwargs):
+    # guarda o id agora: depois do delete o Django zera o pk da instância
+    alerta_id = instance.pk
+    # só publica depois do commit, senão outro processo pode reler o dado antigo
+    transaction.on_commit(lambda: agenda.registrar_alteracao(alerta_id))
+
+
+@receiver(post_save, sender=Medicamento)
+@receiver(post_delete, sender=Medicamento)
+def medicamento_alterado(sender, instance, **kwargs):
+    transaction.on_commit(medicamentos.invalidar)
+
+
+@receiver([post_save, post_delete], sender=Usuario)
+@receiver([post_save, post_delete], sender=Paciente)
+@receiver([post_save, post_delete], sender=Prescricao)
+@receiver([post_save, post_delete], sender=Administracao)
+def registro_alterado(sender, instance, update_fields=None, **kwargs):
+    # carimbo por modelo para o GET condicional da API (core.condicional);
+    # Alerta e Medicamento já trocam o seu pela agenda e pelo catálogo
+    if sender is Usuario and update_fields == frozenset({'last_login'}):
+        # todo login grava last_login, que a API não expõe
+        return
+    nome = sender._meta.model_name
+    transaction.on_commit(lambda: incrementar_versao(nome))
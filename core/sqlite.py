@@ -0,0 +1,45 @@
+"""
+Perfil de produção do SQLite.
+
+Os PRAGMAs de ``SQLITE_PRAGMAS`` são aplicados em toda conexão nova (sinal
+``connection_created``, ver ``core.signals``). O perfil padrão do
+settings é pensado para várias pessoas gravando administrações enquanto
+dashboards leem:
+
+- ``journal_mode=WAL``: leitores não bloqueiam o escritor nem o contrário;
+- ``synchronous=NORMAL``: com WAL, só o checkpoint faz fsync (seguro contra
+  queda do processo; numa queda de energia perde no máximo as últimas
+  transações, sem corromper o arquivo);
+- ``busy_timeout``: espera o lock em vez de falhar com "database is locked";
+- ``cache_size``/``mmap_size``: páginas quentes em memória.
+
+``journal_mode`` fica gravado no arquivo; os demais valem por conexão.
+O checkpoint do WAL e o ``PRAGMA optimize`` periódicos ficam com o comando
+``manage.py sqlite_manutencao``.
+"""
+from django.conf import settings
+
+
+def aplicar_pragmas(connection, pragmas=None):
+    """Executa os PRAGMAs (``SQLITE_PRAGMAS`` por padrão) numa conexão SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    if pragmas is None:
+        pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome} = {valor}')
+
+
+def ler_pragmas(connection, nomes):
+    """Valores atuais dos PRAGMAs pedidos, como ``{nome: valor}``."""
+    valores = {}
+    with connection.cursor() as cursor:
+        for nome in nomes:
+            cursor.execute(f'PRAGMA {nome}')
+            linha = cursor.fetchone()
+            valores[nome] = linha[0] if linha else None
+    return valores
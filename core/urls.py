@@ -9,7 +9,12 @@ from .views import (
     AdministracaoViewSet,
     AlertaViewSet,
     AlertasPendentesAPIView,
+    ConfirmarAlertasAPIView,
+    AdministracoesLoteAPIView,
 )
+from .eventos import alertas_pendentes_stream
+from . import views_async
+from .metricas import metricas
 
 router = DefaultRouter()
 router.register(r'usuarios', UsuarioViewSet)
@@ -22,6 +27,18 @@ router.register(r'alertas', AlertaViewSet)
 urlpatterns = [
     # endpoint custom de alertas pendentes
     path('api/alertas/pendentes/', AlertasPendentesAPIView.as_view(), name='alertas_pendentes_api'),
+    # mesma carga via Server-Sent Events (requer ASGI)
+    path('api/alertas/pendentes/stream/', alertas_pendentes_stream, name='alertas_pendentes_stream'),
+    # confirmação (por usuário) de ocorrências pendentes, em lote
+    path('api/alertas/pendentes/confirmar/', ConfirmarAlertasAPIView.as_view(), name='alertas_confirmar_api'),
+    # doses de uma ronda de medicação, em lote (antes do router: 'lote' casaria com o detalhe)
+    path('api/administracoes/lote/', AdministracoesLoteAPIView.as_view(), name='administracoes_lote_api'),
+    # versões assíncronas (ORM assíncrono, para deploys ASGI): pendentes e números do dashboard
+    path('api/async/alertas/pendentes/', views_async.alertas_pendentes, name='alertas_pendentes_async'),
+    path('api/async/dashboard/', views_async.dashboard_dados, name='dashboard_dados_async'),
+
+    # métricas no formato do Prometheus
+    path('metrics', metricas, name='metricas'),
 
     # demais endpoints REST (ViewSets)
     path('api/', include(router.urls)),
@@ -4,7 +4,7 @@ from .views_frontend import (
     PacienteListView, PacienteDetailView, PacienteCreateView, PacienteUpdateView, PacienteDeleteView,
     MedicamentoListView, MedicamentoCreateView, MedicamentoUpdateView, MedicamentoDeleteView,
     PrescricaoListView, PrescricaoCreateView, PrescricaoUpdateView, PrescricaoDeleteView,
-    AdministracaoListView, AdministracaoCreateView,
+    AdministracaoListView, AdministracaoCreateView, AdministracaoRondaView,
     AlertaListView, AlertaCreateView, AlertaUpdateView, AlertaDeleteView,
     UsuarioListView, UsuarioCreateView, UsuarioUpdateView, UsuarioDeleteView,
 )
@@ -41,6 +41,7 @@ urlpatterns = [
     # Administrações
     path('administracoes/', AdministracaoListView.as_view(), name='administracao_list'),
     path('administracoes/nova/', AdministracaoCreateView.as_view(), name='administracao_create'),
+    path('administracoes/ronda/', AdministracaoRondaView.as_view(), name='administracao_ronda'),
     
     # Alertas
     path('alertas/', AlertaListView.as_view(), name='alerta_list'),
@@ -0,0 +1,110 @@
+"""
+Carimbos de versão compartilhados entre processos.
+
+Cada carimbo fica no backend de cache (``CACHES['default']``) e é trocado a
+cada escrita relevante. Quem guarda dados derivados (agenda de alertas,
+stream SSE, etc.) compara o carimbo para saber se precisa recalcular.
+
+O carimbo é um contador: nasce com o relógio (``time.time_ns()``, para não
+repetir um valor de antes de o cache ser limpo) e cada escrita soma 1 com o
+``incr`` do cache. Quem incrementa sabe se a sua foi a única escrita desde o
+valor que conhecia (``nova == anterior + 1``). O horário da última escrita,
+para o ``Last-Modified``, fica numa chave à parte.
+
+O ``incr`` é atômico no LocMem, no Redis e no Memcached. No
+``FileBasedCache`` (o padrão) ele é um get seguido de set, e dois workers
+podiam ler o mesmo valor e perder um incremento; ali o incremento passa por
+um ``flock`` num arquivo da pasta do cache, que vale entre os processos da
+máquina.
+"""
+import contextlib
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, só para desenvolvimento
+    fcntl = None
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+PREFIXO = 'versao:'
+PREFIXO_ALTERACAO = 'versao_em:'
+
+
+def obter_versao(nome):
+    chave = PREFIXO + nome
+    versao = cache.get(chave)
+    if versao is None:
+        versao = time.time_ns()
+        # add() não sobrescreve se outro processo gravou primeiro
+        if not cache.add(chave, versao, timeout=None):
+            versao = cache.get(chave, versao)
+    return versao
+
+
+def incrementar_versao(nome):
+    """Troca o carimbo de ``nome`` e devolve o novo valor."""
+    cache.set(PREFIXO_ALTERACAO + nome, time.time_ns(), timeout=None)
+    with _trava_incremento():
+        try:
+            return cache.incr(PREFIXO + nome)
+        except ValueError:
+            # carimbo fora do cache (limpo ou expulso): recomeça pelo relógio
+            obter_versao(nome)
+            return cache.incr(PREFIXO + nome)
+
+
+@contextlib.contextmanager
+def _trava_incremento():
+    backend = caches['default']
+    if fcntl is None or not isinstance(backend, FileBasedCache):
+        yield
+        return
+
+    # fora do sufixo .djcache: o clear() e o descarte do backend não apagam
+    os.makedirs(backend._dir, exist_ok=True)
+    with open(os.path.join(backend._dir, 'versoes.lock'), 'a') as arquivo:
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def obter_versoes(*nomes):
+    """Vários carimbos numa ida só ao cache: ``{nome: versao}``."""
+    return obter_versoes_e_alteracao(*nomes)[0]
+
+
+def obter_versoes_e_alteracao(*nomes):
+    """
+    ``({nome: versao}, ultima_alteracao)``, numa ida só ao cache;
+    ``ultima_alteracao`` é o horário (ns) da escrita mais recente entre os
+    carimbos, ou ``None`` se nenhum registrou escrita ainda.
+    """
+    valores = cache.get_many([prefixo + nome for nome in nomes for prefixo in (PREFIXO, PREFIXO_ALTERACAO)])
+    versoes = {}
+    for nome in nomes:
+        versao = valores.get(PREFIXO + nome)
+        versoes[nome] = versao if versao is not None else obter_versao(nome)
+    alteracoes = [valores[PREFIXO_ALTERACAO + nome] for nome in nomes if PREFIXO_ALTERACAO + nome in valores]
+    return versoes, max(alteracoes, default=None)
+
+
+# Os backends de cache do Django não têm I/O assíncrono de verdade: cada
+# método ``a*`` é uma ida à thread síncrona, e ``aget_many`` faz uma por
+# chave. As versões assíncronas fazem uma ida só.
+
+async def aobter_versao(nome):
+    return await sync_to_async(obter_versao)(nome)
+
+
+async def aobter_versoes(*nomes):
+    return await sync_to_async(obter_versoes)(*nomes)
+
+
+async def aobter_versoes_e_alteracao(*nomes):
+    return await sync_to_async(obter_versoes_e_alteracao)(*nomes)
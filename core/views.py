@@ -1,12 +1,29 @@
-from datetime import timedelta
+from functools import cache
 
+from django.db import router
 from django.utils import timezone
-
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
 
+from . import catalogos, serializers
+from .administracoes import registrar_lote
+from .alertas import (
+    calcular_delta,
+    carimbos_pendentes,
+    codificar_cursor,
+    confirmar,
+    consultar_pendentes,
+    decodificar_cursor,
+    filtrar_confirmadas,
+    proxima_mudanca_pendentes,
+    serializar_ocorrencia_pendente,
+)
+from .condicional import responder_condicional
 from .models import Usuario, Paciente, Medicamento, Prescricao, Administracao, Alerta
+from .perfil import medir
 from .serializers import (
     UsuarioSerializer,
     PacienteSerializer,
@@ -14,82 +31,358 @@ from .serializers import (
     PrescricaoSerializer,
     AdministracaoSerializer,
     AlertaSerializer,
+    ConfirmacaoAlertaLoteSerializer,
+    AdministracaoLoteSerializer,
 )
 
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class GetCondicionalMixin:
+    """
+    ``ETag``/``Last-Modified`` em ``list``/``retrieve`` a partir dos carimbos
+    de versão dos modelos em ``versionado_por`` (ver ``core.condicional``).
+    Inclua todo modelo cujo dado aparece no serializer, não só o da ViewSet.
+
+    As leituras continuam na réplica. Lida de lá, a resposta sai sem
+    validadores: a réplica pode estar atrás do carimbo, que muda no commit
+    do primário.
+    """
+    versionado_por = ()
+
+    def list(self, request, *args, **kwargs):
+        listar = super().list
+        return self._responder(request, lambda: listar(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        detalhar = super().retrieve
+        return self._responder(request, lambda: detalhar(request, *args, **kwargs))
+
+    def _responder(self, request, gerar):
+        modelo = self.queryset.model
+        do_primario = router.db_for_read(modelo) == router.db_for_write(modelo)
+        return responder_condicional(request, self.versionado_por, gerar, marcar=do_primario)
+
+
+class CatalogoCacheadoMixin:
+    """
+    Páginas de ``list`` em cache junto com ``catalogo`` (``core.catalogos``);
+    caem quando um registro do catálogo muda.
+    """
+    catalogo = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # a página vai para o cache sob a versão atual do catálogo: lê do
+            # primário, como o próprio catálogo
+            queryset = queryset.using(router.db_for_write(queryset.model))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # a URL completa entra na chave: cursor, page_size e o host usado
+        # nos links next/previous
+        listar = super().list
+        return Response(self.catalogo.derivado(
+            f'api:{request.build_absolute_uri()}',
+            lambda: listar(request, *args, **kwargs).data,
+        ))
+
+
+@cache
+def _campos_do_serializer(serializer_class):
+    # só para ler nomes e ``source``; as respostas usam instâncias próprias
+    return serializer_class().fields
+
+
+def _nomes_do_parametro(valor):
+    if not valor:
+        return None
+    return {nome.strip() for nome in valor.split(',') if nome.strip()}
+
+
+class CamposEsparsosMixin:
+    """
+    ``?fields=a,b`` (só esses campos) e ``?omit=a,b`` (todos menos esses) em
+    ``list``/``retrieve``. O serializer perde os demais campos e a consulta
+    deixa de ler as colunas que só eles usavam: ``defer()`` aqui, só as
+    colunas pedidas no ``values()`` do ``ListaRapidaMixin``.
+
+    ``campos_pesados`` (textos sem limite de tamanho) ficam fora do ``list``
+    a menos que venham em ``?fields=``; o ``retrieve`` traz tudo.
+    """
+    campos_pesados = ()
+
+    def campos_pedidos(self):
+        """Nomes dos campos da resposta, na ordem do serializer; ``None`` fora de ``list``/``retrieve``."""
+        if self.action not in ('list', 'retrieve'):
+            return None
+
+        todos = _campos_do_serializer(self.get_serializer_class())
+        fields = _nomes_do_parametro(self.request.query_params.get('fields'))
+        omit = _nomes_do_parametro(self.request.query_params.get('omit')) or set()
+
+        erros = {}
+        for parametro, nomes in (('fields', fields), ('omit', omit)):
+            desconhecidos = sorted((nomes or set()) - set(todos))
+            if desconhecidos:
+                erros[parametro] = [f"Campos desconhecidos: {', '.join(desconhecidos)}."]
+        if erros:
+            raise ValidationError(erros)
+
+        if fields is None:
+            fields = set(todos)
+            if self.action == 'list':
+                fields -= set(self.campos_pesados)
+        return [nome for nome in todos if nome in fields and nome not in omit]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        pedidos = self.campos_pedidos()
+        if pedidos is None:
+            return queryset
+
+        campos = _campos_do_serializer(self.get_serializer_class())
+        usadas = set()
+        for nome in pedidos:
+            fonte = campos[nome].source
+            if fonte == '*':
+                # SerializerMethodField e afins recebem o objeto inteiro
+                return queryset
+            usadas.add(fonte.split('.')[0])
+
+        modelo = queryset.model
+        nomes_colunas = {campo.name for campo in modelo._meta.concrete_fields}
+        if not usadas <= nomes_colunas:
+            # método/propriedade do modelo: não dá para saber o que ele lê
+            return queryset
+        # chaves estrangeiras ficam: são pequenas e o select_related passa por elas
+        dispensaveis = [
+            campo.name for campo in modelo._meta.concrete_fields
+            if campo.name not in usadas and not campo.is_relation and not campo.primary_key
+        ]
+        return queryset.defer(*dispensaveis) if dispensaveis else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        pedidos = self.campos_pedidos()
+        if pedidos is not None:
+            alvo = serializer.child if isinstance(serializer, ListSerializer) else serializer
+            for nome in list(alvo.fields):
+                if nome not in pedidos:
+                    del alvo.fields[nome]
+        return serializer
+
+
+class ListaRapidaMixin:
+    """
+    ``list`` pelo ``SerializadorLista`` em ``lista_rapida``: ``values()`` e
+    dicts montados direto, mesmo JSON do ``serializer_class``, que continua
+    servindo escrita e ``retrieve``. Usado junto com ``CamposEsparsosMixin``.
+    """
+    lista_rapida = None
+
+    def list(self, request, *args, **kwargs):
+        campos = self.lista_rapida.selecionar(self.campos_pedidos())
+        # a paginação por cursor lê o campo da ordenação em cada linha
+        ordenacao = [campo.lstrip('-') for campo in self.ordering]
+        linhas = self.lista_rapida.valores(
+            self.filter_queryset(self.get_queryset()), campos, extras=ordenacao,
+        )
+        pagina = self.paginate_queryset(linhas)
+        if pagina is not None:
+            return self.get_paginated_response(self.lista_rapida.serializar(pagina, campos))
+        return Response(self.lista_rapida.serializar(linhas, campos))
+
+
+class SerializacaoMedidaMixin:
+    """
+    Soma o tempo de ``list``/``retrieve`` (menos o SQL) em ``serializacao``
+    no cabeçalho ``Server-Timing`` (ver ``core.middleware``).
+    """
+
+    def list(self, request, *args, **kwargs):
+        with medir('serializacao'):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with medir('serializacao'):
+            return super().retrieve(request, *args, **kwargs)
+
+
+class UsuarioViewSet(
+    GetCondicionalMixin, SerializacaoMedidaMixin, CamposEsparsosMixin, viewsets.ModelViewSet
+):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('id',)
+    versionado_por = ('usuario',)
 
 
-class PacienteViewSet(viewsets.ModelViewSet):
+class PacienteViewSet(
+    GetCondicionalMixin, SerializacaoMedidaMixin, CamposEsparsosMixin, viewsets.ModelViewSet
+):
     queryset = Paciente.objects.all()
     serializer_class = PacienteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('id',)
+    versionado_por = ('paciente',)
+    campos_pesados = ('alergias', 'historico_clinico')
 
 
-class MedicamentoViewSet(viewsets.ModelViewSet):
+class MedicamentoViewSet(
+    GetCondicionalMixin, CatalogoCacheadoMixin, SerializacaoMedidaMixin, CamposEsparsosMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Medicamento.objects.all()
     serializer_class = MedicamentoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('id',)
+    versionado_por = ('medicamento',)
+    catalogo = catalogos.medicamentos
 
 
-class PrescricaoViewSet(viewsets.ModelViewSet):
-    queryset = Prescricao.objects.all()
+class PrescricaoViewSet(
+    GetCondicionalMixin, SerializacaoMedidaMixin, ListaRapidaMixin, CamposEsparsosMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Prescricao.objects.select_related('paciente', 'medicamento', 'medico')
     serializer_class = PrescricaoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('-data_criacao', '-id')
+    versionado_por = ('prescricao', 'paciente', 'medicamento', 'usuario')
+    lista_rapida = serializers.lista_prescricoes
 
 
-class AdministracaoViewSet(viewsets.ModelViewSet):
-    queryset = Administracao.objects.all()
+class AdministracaoViewSet(
+    GetCondicionalMixin, SerializacaoMedidaMixin, ListaRapidaMixin, CamposEsparsosMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Administracao.objects.select_related(
+        'prescricao__paciente',
+        'prescricao__medicamento',
+        'usuario',
+    )
     serializer_class = AdministracaoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('-data_hora', '-id')
+    versionado_por = ('administracao', 'prescricao', 'paciente', 'medicamento', 'usuario')
+    lista_rapida = serializers.lista_administracoes
 
 
-class AlertaViewSet(viewsets.ModelViewSet):
-    queryset = Alerta.objects.all()
+class AlertaViewSet(
+    GetCondicionalMixin, SerializacaoMedidaMixin, ListaRapidaMixin, CamposEsparsosMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Alerta.objects.select_related('paciente', 'prescricao__medicamento')
     serializer_class = AlertaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering = ('data_hora', 'id')
+    versionado_por = ('alerta', 'paciente', 'prescricao', 'medicamento')
+    lista_rapida = serializers.lista_alertas
 
 
 class AlertasPendentesAPIView(APIView):
     """
-    Retorna alertas ativos cujo horário está dentro da janela dos próximos 5 minutos.
+    Retorna alertas ativos cujo horário está dentro da janela dos próximos 5 minutos,
+    menos as ocorrências que o usuário já confirmou (``ConfirmarAlertasAPIView``).
+
+    Usado pelo frontend para mostrar badge/modal de alertas pendentes. Quando o
+    servidor roda sob ASGI o frontend prefere o stream SSE
+    (``alertas_pendentes_stream``) e usa este endpoint só como fallback.
 
-    Usado pelo frontend para mostrar badge/modal de alertas pendentes.
+    ``next_check_at`` é o próximo momento em que a lista muda sem nenhuma
+    escrita (uma ocorrência entra ou sai da janela, recorrências incluídas);
+    o polling do frontend dorme até lá, limitado a um intervalo máximo para
+    ainda enxergar alertas criados nesse meio tempo.
+
+    ``cursor`` resume a lista entregue. Com ``?since=<cursor>`` a resposta
+    traz em ``alertas`` só as ocorrências novas ou alteradas desde então e em
+    ``removidos`` as chaves (``"<id>@<data_hora>"``) que saíram da lista; sem
+    mudança, as duas vêm vazias. O cursor é uma chave curta do estado
+    guardado no cache; expirado ou desconhecido, a resposta é 400 e o
+    cliente volta a pedir a lista inteira.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, format=None):
         agora = timezone.now()
-        janela_futuro = agora + timedelta(minutes=5)
-
-        alertas = (
-            Alerta.objects.filter(
-                ativo=True,
-                data_hora__gte=agora,
-                data_hora__lte=janela_futuro,
-            )
-            .select_related('paciente', 'prescricao__medicamento')
-            .order_by('data_hora')
+        pendentes = consultar_pendentes(agora)
+        proxima_mudanca = proxima_mudanca_pendentes(agora, pendentes).isoformat()
+
+        def gerar():
+            estado_anterior = None
+            if request.query_params.get('since'):
+                try:
+                    estado_anterior = decodificar_cursor(request.query_params['since'])
+                except ValueError:
+                    raise ValidationError({'since': 'Cursor inválido.'})
+
+            with medir('serializacao'):
+                itens = [serializar_ocorrencia_pendente(o) for o in pendentes]
+            itens = filtrar_confirmadas(request.user, itens)
+            cursor = codificar_cursor(itens)
+            if estado_anterior is None:
+                return Response({"alertas": itens, "cursor": cursor, "next_check_at": proxima_mudanca})
+            novos, removidos = calcular_delta(itens, estado_anterior)
+            return Response({
+                "alertas": novos,
+                "removidos": removidos,
+                "cursor": cursor,
+                "next_check_at": proxima_mudanca,
+            })
+
+        # a lista muda com o relógio e com as confirmações do usuário, não só
+        # com escritas nos modelos: a próxima mudança da janela e o carimbo
+        # das confirmações entram no ETag e não há Last-Modified. Lista,
+        # confirmações e cursor só são montados quando não cabe o 304.
+        return responder_condicional(
+            request,
+            carimbos_pendentes(request.user),
+            gerar,
+            extra=[proxima_mudanca],
+            com_last_modified=False,
         )
 
-        data = []
-        for alerta in alertas:
-            data.append(
-                {
-                    "id": alerta.id,
-                    "paciente": alerta.paciente.nome,
-                    "tipo": alerta.get_tipo_alerta_display(),
-                    "mensagem": alerta.mensagem,
-                    "data_hora": alerta.data_hora.isoformat(),
-                    "medicamento": (
-                        alerta.prescricao.medicamento.nome
-                        if alerta.prescricao and alerta.prescricao.medicamento
-                        else None
-                    ),
-                }
-            )
-
-        return Response({"alertas": data})
+
+class ConfirmarAlertasAPIView(APIView):
+    """
+    Confirma em lote ocorrências de alertas para o usuário logado:
+    ``POST {"ocorrencias": ["<id>@<data_hora ISO>", ...]}``, com as chaves
+    devolvidas pela API de pendentes. Confirmar de novo não tem efeito;
+    ``confirmados`` conta só as confirmações novas.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, format=None):
+        serializer = ConfirmacaoAlertaLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({"confirmados": confirmar(request.user, serializer.validated_data['ocorrencias'])})
+
+
+class AdministracoesLoteAPIView(APIView):
+    """
+    Registra as doses de uma ronda para o usuário logado:
+    ``POST {"prescricoes": [<id>, ...]}``, uma administração por prescrição,
+    numa só transação (``core.administracoes.registrar_lote``).
+
+    Só prescrições ativas entram; os itens recusados voltam em ``erros``
+    (``{indice: [mensagem]}``) sem impedir os demais. Responde 201 se algum
+    item foi registrado e 400 se nenhum foi.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, format=None):
+        serializer = AdministracaoLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        administracoes, erros = registrar_lote(request.user, serializer.validated_data['prescricoes'])
+        return Response(
+            {
+                "registradas": [
+                    {"id": a.id, "prescricao": a.prescricao_id, "data_hora": a.data_hora}
+                    for a in administracoes
+                ],
+                "erros": erros,
+            },
+            status=status.HTTP_201_CREATED if administracoes else status.HTTP_400_BAD_REQUEST,
+        )
@@ -0,0 +1,166 @@
+"""
+Versões assíncronas dos endpoints consultados o tempo todo por todas as abas
+abertas: alertas pendentes (a API do polling do frontend) e números do
+dashboard.
+
+Servidas por ASGI, uma requisição esperando o cache ou o banco não prende
+uma thread do servidor; a agenda em memória é lida direto no event loop e
+as consultas usam o ORM assíncrono do Django. Sob WSGI continuam
+funcionando (o Django roda a view num event loop próprio), só sem o ganho.
+
+O DRF não tem views assíncronas: a autenticação é a da sessão
+(``request.auser()``) e as respostas seguem o formato das views DRF
+equivalentes.
+
+As middlewares do Django (sessão, CSRF, autenticação...) continuam
+síncronas, e o SQLite não tem driver assíncrono: cada requisição ASGI ainda
+passa várias vezes pela thread síncrona. ``manage.py benchmark_asgi`` mede
+as duas pilhas antes de trocar o servidor; ``ALERTAS_API_ASYNC`` põe o
+polling do frontend na view assíncrona de pendentes.
+"""
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .agenda import HORIZONTE, agenda
+from .alertas import (
+    aconsultar_pendentes,
+    afiltrar_confirmadas,
+    aproxima_mudanca_pendentes,
+    acodificar_cursor,
+    adecodificar_cursor,
+    calcular_delta,
+    carimbos_pendentes,
+    serializar_ocorrencia_pendente,
+)
+from .condicional import aresponder_condicional
+from .consultas import contar
+from .models import Paciente, Medicamento, Prescricao, Administracao
+from .perfil import medir
+from .versoes import aobter_versao
+
+
+def _nao_autenticado():
+    return JsonResponse(
+        {"detail": "As credenciais de autenticação não foram fornecidas."},
+        status=403,
+    )
+
+
+@require_GET
+async def alertas_pendentes(request):
+    """
+    Mesma resposta de ``AlertasPendentesAPIView`` (``?since=``, ``cursor``,
+    ``next_check_at``, ``ETag``), sem ocupar uma thread por requisição.
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return _nao_autenticado()
+
+    agora = timezone.now()
+    pendentes = await aconsultar_pendentes(agora)
+    proxima_mudanca = (await aproxima_mudanca_pendentes(agora, pendentes)).isoformat()
+
+    async def gerar():
+        estado_anterior = None
+        if request.GET.get('since'):
+            try:
+                estado_anterior = await adecodificar_cursor(request.GET['since'])
+            except ValueError:
+                return JsonResponse({"since": ["Cursor inválido."]}, status=400)
+
+        with medir('serializacao'):
+            itens = [serializar_ocorrencia_pendente(o) for o in pendentes]
+        itens = await afiltrar_confirmadas(usuario, itens)
+        cursor = await acodificar_cursor(itens)
+        if estado_anterior is None:
+            return JsonResponse({"alertas": itens, "cursor": cursor, "next_check_at": proxima_mudanca})
+        novos, removidos = calcular_delta(itens, estado_anterior)
+        return JsonResponse({
+            "alertas": novos,
+            "removidos": removidos,
+            "cursor": cursor,
+            "next_check_at": proxima_mudanca,
+        })
+
+    return await aresponder_condicional(
+        request,
+        carimbos_pendentes(usuario),
+        gerar,
+        extra=[proxima_mudanca],
+        com_last_modified=False,
+    )
+
+
+@require_GET
+async def dashboard_dados(request):
+    """
+    Números do ``DashboardView`` em JSON, para atualizar os cards sem
+    recarregar a página. Compartilhados entre usuários pelo mesmo tempo e
+    com a mesma invalidação do contexto do dashboard.
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return _nao_autenticado()
+
+    chave = f"dashboard:dados:{await aobter_versao('alerta')}"
+    dados = await cache.aget(chave)
+    if dados is None:
+        dados = await _calcular_dashboard(timezone.now())
+        await cache.aset(chave, dados, settings.DASHBOARD_CACHE_SEGUNDOS)
+    return JsonResponse(dados)
+
+
+async def _calcular_dashboard(agora):
+    # mesmos recortes de DashboardView.calcular_dados
+    inicio_dia = datetime.combine(agora.date(), datetime.min.time())
+    fim_dia = inicio_dia + timedelta(days=1)
+
+    limite_15 = agora + timedelta(minutes=15)
+    limite_30 = agora + timedelta(minutes=30)
+    limite_60 = agora + timedelta(hours=1)
+    limite_4h = agora + timedelta(hours=4)
+
+    dados = {
+        'alertas_15min': await agenda.acontar(agora, limite_15),
+        'alertas_30min': await agenda.acontar(limite_15, limite_30),
+        'alertas_1h': await agenda.acontar(limite_30, limite_60),
+        'alertas_4h': await agenda.acontar(limite_60, limite_4h),
+        'alertas_dia': await agenda.acontar(inicio_dia, fim_dia),
+        'proximos_alertas': [
+            serializar_ocorrencia_pendente(o)
+            for o in (await agenda.aentre(agora, agora + HORIZONTE))[:5]
+        ],
+    }
+
+    # ``contar`` junta as três contagens numa consulta; o ORM assíncrono
+    # faria uma por ``acount()``
+    dados.update(await sync_to_async(contar)(
+        total_pacientes=Paciente.objects.all(),
+        total_medicamentos=Medicamento.objects.all(),
+        total_prescricoes_hoje=Prescricao.objects.filter(
+            data_criacao__gte=inicio_dia,
+            data_criacao__lt=fim_dia,
+        ),
+    ))
+
+    administracoes = (
+        Administracao.objects.filter(data_hora__gte=agora)
+        .select_related('prescricao__paciente', 'prescricao__medicamento')
+        .order_by('data_hora')[:5]
+    )
+    dados['proximas_administracoes'] = [
+        {
+            "id": administracao.id,
+            "paciente": administracao.prescricao.paciente.nome,
+            "medicamento": administracao.prescricao.medicamento.nome,
+            "data_hora": administracao.data_hora.isoformat(),
+        }
+        async for administracao in administracoes
+    ]
+    return dados
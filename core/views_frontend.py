@@ -1,5 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+from django.db.models import Case, OuterRef, Prefetch, Q, Subquery, Value, When
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView, LogoutView
@@ -37,11 +39,20 @@ class CustomLogoutView(LoginRequiredMixin, LogoutView):
         messages.info(request, 'Você foi desconectado com sucesso.')
         return super().dispatch(request, *args, **kwargs)
 
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 from django.utils import timezone
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
 
+from django.conf import settings
+from django.core.cache import cache
+
+from . import catalogos
+from .administracoes import LOTE_MAXIMO, novo_envio, registrar_lote, reservar_envio
+from .agenda import HORIZONTE, agenda
+from .consultas import contar, filtro_prefixo, normalizar_busca
+from .recorrencia import proxima_ocorrencia
+from .versoes import obter_versao
 from .models import Paciente, Medicamento, Prescricao, Administracao, Alerta
 
 
@@ -56,8 +67,22 @@ class DashboardView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        # o mesmo contexto serve a todos os usuários por alguns segundos;
+        # a versão dos alertas na chave descarta o cache quando um alerta muda
+        chave = f"dashboard:contexto:{obter_versao('alerta')}"
+        dados = cache.get(chave)
+        if dados is None:
+            dados = self.calcular_dados()
+            cache.set(chave, dados, settings.DASHBOARD_CACHE_SEGUNDOS)
+
+        context.update(dados)
+        return context
+
+    def calcular_dados(self):
         agora = timezone.now()
         hoje = agora.date()
+        inicio_dia = datetime.combine(hoje, datetime.min.time())
+        fim_dia = inicio_dia + timedelta(days=1)
 
         # limites de tempo
         limite_15 = agora + timedelta(minutes=15)
@@ -65,64 +90,148 @@ class DashboardView(LoginRequiredMixin, ListView):
         limite_60 = agora + timedelta(hours=1)
         limite_4h = agora + timedelta(hours=4)
 
-        # base: alertas ativos no futuro
-        base_futuro = Alerta.objects.filter(
-            ativo=True,
-            data_hora__gte=agora,
-        )
+        dados = {}
 
-        # buckets de tempo
-        context['alertas_15min'] = base_futuro.filter(
-            data_hora__lt=limite_15
-        ).count()
+        # buckets de tempo pela agenda em memória, não por uma agregação
+        # condicional no banco: as recorrências não são linhas (um COUNT sobre
+        # data_hora só veria a primeira ocorrência de um alerta repetido) e a
+        # agenda responde sem consulta nenhuma
+        dados['alertas_15min'] = agenda.contar(agora, limite_15)
+        dados['alertas_30min'] = agenda.contar(limite_15, limite_30)
+        dados['alertas_1h'] = agenda.contar(limite_30, limite_60)
+        dados['alertas_4h'] = agenda.contar(limite_60, limite_4h)
 
-        context['alertas_30min'] = base_futuro.filter(
-            data_hora__gte=limite_15,
-            data_hora__lt=limite_30,
-        ).count()
+        # do dia (focados em hoje – pode ter passado ou futuro)
+        dados['alertas_dia'] = agenda.contar(inicio_dia, fim_dia)
+
+        # lista simples de próximos alertas (pra card de baixo), dentro do
+        # horizonte coberto pela agenda
+        dados['proximos_alertas'] = agenda.entre(agora, agora + HORIZONTE)[:5]
+
+        # cards gerais já existentes, todos numa consulta só
+        dados.update(contar(
+            total_pacientes=Paciente.objects.all(),
+            total_medicamentos=Medicamento.objects.all(),
+            total_prescricoes_hoje=Prescricao.objects.filter(
+                data_criacao__gte=inicio_dia,
+                data_criacao__lt=fim_dia,
+            ),
+        ))
+
+        dados['proximas_administracoes'] = list(
+            Administracao.objects.filter(data_hora__gte=agora)
+            .select_related('prescricao__paciente', 'prescricao__medicamento')
+            .order_by('data_hora')[:5]
+        )
 
-        context['alertas_1h'] = base_futuro.filter(
-            data_hora__gte=limite_30,
-            data_hora__lt=limite_60,
-        ).count()
+        return dados
 
-        context['alertas_4h'] = base_futuro.filter(
-            data_hora__gte=limite_60,
-            data_hora__lt=limite_4h,
-        ).count()
+# Listagens com busca e paginação no servidor
+class BuscaPaginadaMixin:
+    """
+    Listagem paginada com filtros aplicados no banco.
 
-        # do dia (focados em hoje – pode ter passado ou futuro)
-        context['alertas_dia'] = Alerta.objects.filter(
-            ativo=True,
-            data_hora__date=hoje,
-        ).count()
-
-        # lista simples de próximos alertas (pra card de baixo)
-        context['proximos_alertas'] = base_futuro.order_by('data_hora')[:5]
-
-        # cards gerais já existentes
-        context['total_pacientes'] = Paciente.objects.count()
-        context['total_medicamentos'] = Medicamento.objects.count()
-        context['total_prescricoes_hoje'] = Prescricao.objects.filter(
-            data_criacao__date=hoje
-        ).count()
-        context['proximas_administracoes'] = Administracao.objects.filter(
-            data_hora__gte=agora
-        ).order_by('data_hora')[:5]
+    Com ``?formato=json`` a view devolve só as linhas da tabela
+    (``template_linhas``) e a paginação já renderizadas; é o que a busca com
+    debounce do ``main.js`` usa para atualizar a página sem recarregar.
+    """
+    paginate_by = 25
+    template_linhas = None
+
+    def get_queryset(self):
+        return self.filtrar(super().get_queryset(), self.request.GET)
+
+    def filtrar(self, queryset, params):
+        return queryset
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('formato') == 'json':
+            return JsonResponse({
+                'html': render_to_string(self.template_linhas, context, request=self.request),
+                'paginacao': render_to_string('core/_paginacao.html', context, request=self.request),
+                'total': context['paginator'].count,
+            })
+        return super().render_to_response(context, **response_kwargs)
+
+
+def _termo_busca(params):
+    return params.get('q', '').strip()
+
+
+def _filtrar_periodo(queryset, campo, params):
+    """Aplica ``?data_inicio=`` / ``?data_fim=`` (AAAA-MM-DD, inclusivos) a um DateTimeField."""
+    try:
+        if params.get('data_inicio'):
+            inicio = date.fromisoformat(params['data_inicio'])
+            queryset = queryset.filter(**{f'{campo}__gte': datetime.combine(inicio, datetime.min.time())})
+        if params.get('data_fim'):
+            fim = date.fromisoformat(params['data_fim']) + timedelta(days=1)
+            queryset = queryset.filter(**{f'{campo}__lt': datetime.combine(fim, datetime.min.time())})
+    except ValueError:
+        # data inválida na URL: ignora o filtro em vez de quebrar a listagem
+        pass
+    return queryset
+
+
+def _buscar_nome(queryset, termo, *outros_prefixos):
+    """
+    Registros cujo nome contém ``termo`` (ou cujo campo em
+    ``outros_prefixos`` começa com ele), com os que começam com o termo
+    primeiro. O nome é comparado em ``nome_busca``, normalizado como o termo
+    (``normalizar_busca``), para não depender de caixa nem de acento. Uma
+    consulta só; procurar no meio do nome lê a tabela de pacientes inteira.
+    """
+    termo_nome = normalizar_busca(termo)
+    prefixo = filtro_prefixo('nome_busca', termo_nome)
+    for campo in outros_prefixos:
+        prefixo |= filtro_prefixo(campo, termo)
+    ordenacao = queryset.query.order_by or queryset.model._meta.ordering
+    return (
+        queryset.filter(Q(nome_busca__contains=termo_nome) | prefixo)
+        .alias(fora_do_prefixo=Case(When(prefixo, then=Value(0)), default=Value(1)))
+        .order_by('fora_do_prefixo', *ordenacao)
+    )
+
+
+def _pacientes_por_nome(termo):
+    return _buscar_nome(Paciente.objects.all(), termo)
+
+
+def _filtrar_paciente(queryset, campo, termo):
+    # subselect em vez de join: o banco procura o nome só na tabela de
+    # pacientes, em vez de percorrer a listagem inteira testando o nome
+    return queryset.filter(**{f'{campo}__in': _pacientes_por_nome(termo).values('pk')})
 
-        return context
 
 # Paciente Views
-class PacienteListView(LoginRequiredMixin, ListView):
+class PacienteListView(LoginRequiredMixin, BuscaPaginadaMixin, ListView):
     model = Paciente
     template_name = 'core/paciente_list.html'
+    template_linhas = 'core/_paciente_linhas.html'
     context_object_name = 'pacientes'
+    ordering = ('nome', 'id')
+
+    def filtrar(self, queryset, params):
+        termo = _termo_busca(params)
+        if termo:
+            # nome contendo o termo, ou prontuário/CPF começando com ele
+            queryset = _buscar_nome(queryset, termo, 'prontuario', 'cpf')
+        return queryset
 
 class PacienteDetailView(LoginRequiredMixin, DetailView):
     model = Paciente
     template_name = 'core/paciente_detail.html'
     context_object_name = 'paciente'
 
+    def get_queryset(self):
+        # prescrições + medicamento numa consulta extra, em vez de uma por linha
+        return Paciente.objects.prefetch_related(
+            Prefetch(
+                'prescricao_set',
+                queryset=Prescricao.objects.select_related('medicamento').order_by('-data_criacao'),
+            )
+        )
+
 class PacienteCreateView(LoginRequiredMixin, CreateView):
     model = Paciente
     form_class = PacienteForm
@@ -153,11 +262,21 @@ class PacienteDeleteView(LoginRequiredMixin, DeleteView):
         return super().form_valid(form)
 
 # Medicamento Views
-class MedicamentoListView(LoginRequiredMixin, ListView):
+class MedicamentoListView(LoginRequiredMixin, BuscaPaginadaMixin, ListView):
     model = Medicamento
     template_name = 'core/medicamento_list.html'
+    template_linhas = 'core/_medicamento_linhas.html'
     context_object_name = 'medicamentos'
 
+    def get_queryset(self):
+        # catálogo em cache (core.catalogos), já ordenado por nome; a busca
+        # por prefixo filtra em memória
+        medicamentos = catalogos.medicamentos.itens()
+        termo = _termo_busca(self.request.GET).upper()
+        if termo:
+            medicamentos = [m for m in medicamentos if m.nome.upper().startswith(termo)]
+        return medicamentos
+
 class MedicamentoCreateView(LoginRequiredMixin, CreateView):
     model = Medicamento
     form_class = MedicamentoForm
@@ -188,18 +307,22 @@ class MedicamentoDeleteView(LoginRequiredMixin, DeleteView):
         return super().form_valid(form)
 
 # Prescricao Views
-class PrescricaoListView(LoginRequiredMixin, ListView):
+class PrescricaoListView(LoginRequiredMixin, BuscaPaginadaMixin, ListView):
     model = Prescricao
     template_name = 'core/prescricao_list.html'
+    template_linhas = 'core/_prescricao_linhas.html'
     context_object_name = 'prescricoes'
+    # mais recentes primeiro
+    ordering = ('-data_criacao', '-id')
 
     def get_queryset(self):
-        # Lista todas as prescrições, mais recentes primeiro
-        return (
-            Prescricao.objects
-            .select_related('paciente', 'medicamento', 'medico')
-            .order_by('-data_criacao')
-        )
+        return super().get_queryset().select_related('paciente', 'medicamento', 'medico')
+
+    def filtrar(self, queryset, params):
+        termo = _termo_busca(params)
+        if termo:
+            queryset = _filtrar_paciente(queryset, 'paciente', termo)
+        return queryset
 
 class PrescricaoCreateView(LoginRequiredMixin, CreateView):
     model = Prescricao
@@ -244,10 +367,25 @@ class PrescricaoDeleteView(LoginRequiredMixin, DeleteView):
 
 
 # Administracao Views
-class AdministracaoListView(LoginRequiredMixin, ListView):
+class AdministracaoListView(LoginRequiredMixin, BuscaPaginadaMixin, ListView):
     model = Administracao
     template_name = 'core/administracao_list.html'
+    template_linhas = 'core/_administracao_linhas.html'
     context_object_name = 'administracoes'
+    ordering = ('-data_hora', '-id')
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'prescricao__paciente',
+            'prescricao__medicamento',
+            'usuario',
+        )
+
+    def filtrar(self, queryset, params):
+        termo = _termo_busca(params)
+        if termo:
+            queryset = _filtrar_paciente(queryset, 'prescricao__paciente', termo)
+        return _filtrar_periodo(queryset, 'data_hora', params)
 
 class AdministracaoCreateView(LoginRequiredMixin, CreateView):
     model = Administracao
@@ -260,11 +398,98 @@ class AdministracaoCreateView(LoginRequiredMixin, CreateView):
         messages.success(self.request, 'Administração registrada com sucesso!')
         return super().form_valid(form)
 
+class AdministracaoRondaView(LoginRequiredMixin, ListView):
+    """
+    Ronda de medicação: as prescrições ativas (``?q=`` filtra pelo nome do
+    paciente), uma caixa por dose; um envio registra todas as marcadas numa
+    só transação (``core.administracoes.registrar_lote``).
+
+    Cada formulário leva um identificador de envio: reenviar o mesmo (clique
+    duplo, voltar no navegador) não registra as doses de novo.
+    """
+    template_name = 'core/administracao_ronda.html'
+    context_object_name = 'prescricoes'
+    paginate_by = 50
+
+    def get_queryset(self):
+        # horário da última dose, para não repetir a de quem já recebeu
+        ultima = (
+            Administracao.objects.filter(prescricao=OuterRef('pk'))
+            .order_by('-data_hora')
+            .values('data_hora')[:1]
+        )
+        queryset = (
+            Prescricao.objects.filter(status='ativa')
+            .select_related('paciente', 'medicamento')
+            .annotate(ultima_administracao=Subquery(ultima))
+            # textos longos que a ronda não mostra
+            .defer('observacoes', 'paciente__alergias', 'paciente__historico_clinico')
+            .order_by('paciente__nome', 'id')
+        )
+        termo = _termo_busca(self.request.GET)
+        if termo:
+            queryset = _filtrar_paciente(queryset, 'paciente', termo)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['envio'] = novo_envio()
+        return context
+
+    def post(self, request, *args, **kwargs):
+        # isdigit() aceita '²', que o int() recusa
+        prescricao_ids = [
+            int(valor) for valor in request.POST.getlist('prescricoes') if valor.isascii() and valor.isdecimal()
+        ]
+        if not prescricao_ids:
+            messages.warning(request, 'Nenhuma dose marcada.')
+        elif len(prescricao_ids) > LOTE_MAXIMO:
+            messages.warning(request, f'Marque no máximo {LOTE_MAXIMO} doses por envio.')
+        elif not reservar_envio(request.POST.get('envio', '')):
+            messages.warning(request, 'Este envio já foi registrado. Confira a ronda antes de marcar de novo.')
+        else:
+            administracoes, erros = registrar_lote(request.user, prescricao_ids)
+            if administracoes:
+                messages.success(request, f'{len(administracoes)} administração(ões) registrada(s) com sucesso!')
+            for mensagens in erros.values():
+                messages.warning(request, mensagens[0])
+        # volta para a mesma ronda (com a busca) para seguir registrando
+        return redirect(request.get_full_path())
+
+
 # Alerta Views
-class AlertaListView(LoginRequiredMixin, ListView):
+class AlertaListView(LoginRequiredMixin, BuscaPaginadaMixin, ListView):
     model = Alerta
     template_name = 'core/alerta_list.html'
+    template_linhas = 'core/_alerta_linhas.html'
     context_object_name = 'alertas'
+    ordering = ('-data_hora', '-id')
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('paciente', 'prescricao__medicamento')
+
+    def filtrar(self, queryset, params):
+        termo = _termo_busca(params)
+        if termo:
+            queryset = _filtrar_paciente(queryset, 'paciente', termo)
+
+        status = params.get('status')
+        if status == 'ativo':
+            queryset = queryset.filter(ativo=True)
+        elif status == 'inativo':
+            queryset = queryset.filter(ativo=False)
+
+        return _filtrar_periodo(queryset, 'data_hora', params)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        # próximo disparo de cada alerta (recorrências expandidas em aritmética)
+        agora = timezone.now()
+        for alerta in context['alertas']:
+            alerta.proxima_ocorrencia = proxima_ocorrencia(alerta, agora)
+
+        return context
 
 class AlertaCreateView(LoginRequiredMixin, CreateView):
     model = Alerta
@@ -12,9 +12,17 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from .ambiente import banco_de_url, cache_de_url, carregar_env, env, env_bool, env_int
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# variáveis do .env (modelo em .env.example) valem só se não estiverem
+# definidas no ambiente; env()/env_bool()/env_int() consultam os dois
+carregar_env(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -44,8 +52,14 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # toda listagem é paginada por cursor (ver core.pagination)
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.CursorPaginacao",
+    "PAGE_SIZE": 50,
 }
 
+# maior ?page_size= aceito pelas listagens da API
+API_MAX_PAGE_SIZE = 200
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -57,14 +71,20 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.alertas',
             ],
         },
     },
 ]
 
 MIDDLEWARE = [
+    # primeiro da pilha para o tempo total incluir os demais middlewares
+    'core.middleware.PerfilRequisicaoMiddleware',
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # leituras na réplica, escritas e leituras logo após escrita no primário
+    'core.routers.PrimarioAposEscritaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -82,14 +102,125 @@ WSGI_APPLICATION = 'medicacao_hospitalar.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Banco vindo de DATABASE_URL (formatos em medicacao_hospitalar/ambiente.py);
+# sem ela, SQLite em db.sqlite3 na raiz do projeto.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': banco_de_url(
+        env('DATABASE_URL', 'sqlite:///db.sqlite3'),
+        BASE_DIR,
+        # conexões persistentes: o worker reaproveita a conexão entre
+        # requisições e confere se ela ainda vale antes de usar
+        conn_max_age=env_int('DB_CONN_MAX_AGE', 60),
+        conn_health_checks=env_bool('DB_CONN_HEALTH_CHECKS', True),
+    ),
+}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # transações de escrita pegam o lock no BEGIN e esperam o
+    # busy_timeout; no modo padrão (DEFERRED) quem lê e depois grava
+    # falha na hora com "database is locked"
+    DATABASES['default']['OPTIONS'].setdefault('transaction_mode', 'IMMEDIATE')
+
+# Pool de conexões do psycopg 3 (só PostgreSQL; requer "psycopg[pool]").
+if env_bool('DB_POOL'):
+    if DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+        raise ImproperlyConfigured("DB_POOL só é suportado com PostgreSQL.")
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env_int('DB_POOL_MIN', 2),
+        'max_size': env_int('DB_POOL_MAX', 10),
+        'timeout': env_int('DB_POOL_TIMEOUT', 10),
     }
+    # o pool já reaproveita as conexões; o Django não aceita os dois juntos
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Réplica de leitura opcional (core.routers). Localmente dá para usar uma
+# segunda cópia do SQLite mantida por "manage.py sincronizar_replica":
+#   DATABASE_REPLICA_URL=sqlite:///db_replica.sqlite3
+if env('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = banco_de_url(
+        env('DATABASE_REPLICA_URL'),
+        BASE_DIR,
+        conn_max_age=env_int('DB_CONN_MAX_AGE', 60),
+        conn_health_checks=env_bool('DB_CONN_HEALTH_CHECKS', True),
+    )
+    # nos testes a réplica é o próprio banco de teste
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# segundos em que a sessão continua lendo do primário depois de gravar
+REPLICA_PRIMARIO_APOS_ESCRITA = env_int('REPLICA_PRIMARIO_APOS_ESCRITA', 5)
+
+# Perfil de produção do SQLite, aplicado em toda conexão (core.sqlite).
+# Vazio ({}) mantém os padrões do SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'cache_size': -64000,  # negativo = KiB (64 MB por conexão)
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Os carimbos de versão (core.versoes) e os catálogos (core.catalogos)
+# precisam de um backend compartilhado entre os workers: arquivo na mesma
+# máquina (padrão) ou Redis/Memcached com mais de um servidor.
+# Ex.: CACHE_URL=redis://localhost:6379/0 (requer `pip install redis`).
+
+CACHES = {
+    'default': cache_de_url(env('CACHE_URL', 'file:///.cache'), BASE_DIR),
 }
 
 
+# Stream SSE de alertas pendentes (core.eventos)
+
+ALERTAS_SSE_INTERVALO_VERIFICACAO = 2  # segundos
+ALERTAS_SSE_KEEPALIVE = 20  # segundos
+
+# Polling do frontend pela view assíncrona de pendentes (core.views_async).
+# Só compensa servido por ASGI; compare antes com `manage.py benchmark_asgi`.
+ALERTAS_API_ASYNC = env_bool('ALERTAS_API_ASYNC', False)
+
+
+# Agenda em memória dos alertas ativos (core.agenda)
+
+AGENDA_ALERTAS_HORIZONTE_HORAS = 6
+AGENDA_ALERTAS_IDADE_MAXIMA = 60  # segundos
+
+# contexto do dashboard compartilhado entre usuários
+DASHBOARD_CACHE_SEGUNDOS = 5
+
+
+# Perfil por requisição (core.middleware.PerfilRequisicaoMiddleware)
+# Cabeçalho Server-Timing com tempo total, SQL, renderização e serialização.
+# Vai para todo cliente (inclusive anônimo): por padrão só em desenvolvimento.
+
+PERFIL_REQUISICOES_ATIVO = env_bool('PERFIL_REQUISICOES_ATIVO', DEBUG)
+
+# grava um cProfile das requisições amostradas que passarem do limiar;
+# None desliga o cProfile (o Server-Timing continua)
+PERFIL_CPROFILE_LIMIAR_MS = None
+PERFIL_CPROFILE_AMOSTRAGEM = 0.1  # fração das requisições perfiladas
+PERFIL_CPROFILE_DIRETORIO = BASE_DIR / 'perfis'
+
+
+# Métricas Prometheus em /metrics (core.metricas)
+
+METRICAS_ATIVO = True
+
+# cada worker grava seu estado aqui; o /metrics soma todos os arquivos.
+# Limpar o diretório ao reiniciar o serviço.
+METRICAS_DIRETORIO = BASE_DIR / '.metricas'
+METRICAS_INTERVALO_GRAVACAO = 1.0  # segundos
+
+# o /metrics exige "Authorization: Bearer <token>"; sem token ele só
+# responde com DEBUG ligado (expõe contagens clínicas)
+METRICAS_TOKEN = env('METRICAS_TOKEN')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,413 @@
+// Badge e modal de alertas pendentes, compartilhados entre as abas do navegador.
+//
+// Só uma aba por navegador (a "líder", eleita com a Web Locks API) abre o
+// stream SSE ou faz o polling; ela repassa cada lista recebida às outras abas
+// por um BroadcastChannel. Confirmações feitas em qualquer aba valem para
+// todas. Quando a líder fecha, o lock é liberado e outra aba assume.
+//
+// As confirmações também vão para o servidor (por usuário): a API e o stream
+// deixam de mandar a ocorrência confirmada, inclusive depois de recarregar.
+// O polling pede só o que mudou (?since=<cursor>).
+//
+// Sem Web Locks ou BroadcastChannel cada aba consulta o servidor sozinha,
+// como antes.
+(function () {
+    const script = document.currentScript;
+    const apiUrl = script.dataset.apiUrl;
+    const streamUrl = script.dataset.streamUrl;
+    const confirmarUrl = script.dataset.confirmarUrl;
+
+    // Polling adaptativo: a API informa em next_check_at quando a lista
+    // muda sozinha (um alerta entra ou sai da janela) e a aba dorme até
+    // lá. O máximo limita a espera para enxergar alertas criados nesse
+    // meio tempo e fica bem abaixo da janela de pendentes (5 minutos): um
+    // alerta criado para daqui a pouco aparece antes do horário. O mínimo
+    // protege contra relógio adiantado.
+    const INTERVALO_MINIMO_MS = 1000;
+    const INTERVALO_MAXIMO_MS = 60 * 1000; // 1 minuto
+    const INTERVALO_FALHA_MS = 15000; // resposta com erro ou sem next_check_at
+
+    const NOME_LOCK = 'cuidemed-alertas-lider';
+    const NOME_CANAL = 'cuidemed-alertas';
+
+    const canal = typeof BroadcastChannel !== 'undefined' ? new BroadcastChannel(NOME_CANAL) : null;
+    let lider = false;
+
+    // polling só roda quando o stream SSE não está disponível
+    let pollingAtivo = false;
+    let pollingTimer = null;
+    let verificando = false;
+
+    // cursor da última resposta do polling; vale para a lista em ultimosDados
+    let cursor = null;
+
+    // Ocorrências de alertas "confirmadas" em qualquer aba. A chave inclui o
+    // horário porque um alerta recorrente volta a disparar no próximo passo.
+    const ackedAlertIds = new Set();
+
+    function chaveOcorrencia(alerta) {
+        return `${alerta.id}@${alerta.data_hora}`;
+    }
+
+    // Última resposta do servidor, sem filtro (a líder repassa às novas abas)
+    let ultimosDados = null;
+
+    // Última lista de alertas pendentes (segundo a API, menos os confirmados)
+    let latestPending = [];
+
+    // IDs exibidos no modal na abertura atual
+    let currentModalIds = [];
+
+    let modalEl = null;
+    let modalInstance = null;
+
+    function formatHoraBr(isoString) {
+        try {
+            const dt = new Date(isoString);
+            const dia = String(dt.getDate()).padStart(2, '0');
+            const mes = String(dt.getMonth() + 1).padStart(2, '0');
+            const hora = String(dt.getHours()).padStart(2, '0');
+            const min = String(dt.getMinutes()).padStart(2, '0');
+            return `${dia}/${mes} ${hora}:${min}`;
+        } catch (e) {
+            return '';
+        }
+    }
+
+    function escapeHtml(value) {
+        if (value === null || value === undefined) return '';
+        return String(value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#039;');
+    }
+
+    function updateBadge() {
+        const badgeEl = document.getElementById('alertasBadge');
+        if (!badgeEl) return;
+
+        const count = latestPending.length;
+
+        if (count > 0) {
+            badgeEl.textContent = count;
+            badgeEl.classList.remove('d-none');
+        } else {
+            badgeEl.classList.add('d-none');
+        }
+    }
+
+    function showAlertasModal(alertas) {
+        if (!alertas.length) return;
+
+        const listaEl = document.getElementById('alertaModalLista');
+        if (!modalEl || !listaEl) return;
+
+        currentModalIds = alertas.map(chaveOcorrencia);
+
+        const html = alertas.map(alerta => {
+            const paciente = escapeHtml(alerta.paciente || '');
+            const tipo = escapeHtml(alerta.tipo || '');
+            const mensagem = escapeHtml(alerta.mensagem || '');
+            const med = escapeHtml(alerta.medicamento || '');
+            const horario = formatHoraBr(alerta.data_hora);
+
+            return `
+                <div class="border rounded-3 p-3 mb-3">
+                    <div class="d-flex justify-content-between align-items-center mb-1">
+                        <div>
+                            <strong class="d-block">${paciente}</strong>
+                            ${tipo ? `<span class="badge bg-primary">${tipo}</span>` : ''}
+                        </div>
+                        <small class="text-muted">${horario}</small>
+                    </div>
+                    ${med ? `<div class="small text-muted mb-1">Medicação: ${med}</div>` : ''}
+                    ${mensagem ? `<div>${mensagem}</div>` : ''}
+                </div>
+            `;
+        }).join('');
+
+        listaEl.innerHTML = html;
+
+        if (typeof bootstrap !== 'undefined' && bootstrap.Modal) {
+            modalInstance = bootstrap.Modal.getOrCreateInstance(modalEl, {
+                backdrop: 'static',
+                keyboard: false
+            });
+            modalInstance.show();
+        }
+    }
+
+    // -----------------------------
+    // Estado compartilhado
+    // -----------------------------
+
+    function aplicarAlertas(data) {
+        if (!data || !Array.isArray(data.alertas)) {
+            return;
+        }
+
+        ultimosDados = data;
+
+        // Ocorrência que saiu da lista já passou (ou o alerta mudou):
+        // a confirmação dela não serve mais
+        const chaves = new Set(data.alertas.map(chaveOcorrencia));
+        ackedAlertIds.forEach(id => {
+            if (!chaves.has(id)) ackedAlertIds.delete(id);
+        });
+
+        filtrarPendentes();
+    }
+
+    // Confia na API: tudo que ela mandar é "pendente"; aqui só removemos os
+    // já confirmados
+    function filtrarPendentes() {
+        const alertas = ultimosDados ? ultimosDados.alertas : [];
+        latestPending = alertas.filter(a => !ackedAlertIds.has(chaveOcorrencia(a)));
+        updateBadge();
+    }
+
+    function lerCookie(nome) {
+        const item = document.cookie.split('; ').find(c => c.startsWith(nome + '='));
+        return item ? decodeURIComponent(item.slice(nome.length + 1)) : null;
+    }
+
+    async function enviarConfirmacoes(ids) {
+        try {
+            await fetch(confirmarUrl, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': lerCookie('csrftoken') || '',
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: JSON.stringify({ ocorrencias: ids })
+            });
+        } catch (e) {
+            // a confirmação local continua valendo nesta sessão do navegador
+            console.error('Erro ao confirmar alertas:', e);
+        }
+    }
+
+    function confirmar(ids) {
+        ids.forEach(id => ackedAlertIds.add(id));
+        filtrarPendentes();
+
+        // modal aberto só com alertas já confirmados em outra aba
+        if (modalInstance && currentModalIds.length && currentModalIds.every(id => ackedAlertIds.has(id))) {
+            currentModalIds = [];
+            modalInstance.hide();
+        }
+    }
+
+    // só a líder chama: aplica aqui e repassa às outras abas
+    function receberDoServidor(data) {
+        aplicarAlertas(data);
+        if (canal) {
+            canal.postMessage({ tipo: 'alertas', data: data });
+        }
+    }
+
+    if (canal) {
+        canal.onmessage = function (e) {
+            const msg = e.data || {};
+
+            if (msg.tipo === 'alertas') {
+                aplicarAlertas(msg.data);
+            } else if (msg.tipo === 'confirmados') {
+                confirmar(msg.ids || []);
+            } else if (msg.tipo === 'pedir_estado' && lider && ultimosDados) {
+                // aba nova: manda a última lista e as confirmações vigentes
+                canal.postMessage({ tipo: 'estado', data: ultimosDados, confirmados: Array.from(ackedAlertIds) });
+            } else if (msg.tipo === 'estado' && !lider) {
+                (msg.confirmados || []).forEach(id => ackedAlertIds.add(id));
+                aplicarAlertas(msg.data);
+            }
+        };
+    }
+
+    // -----------------------------
+    // Consulta ao servidor (só na líder)
+    // -----------------------------
+
+    // aplica um delta (?since=) sobre a lista atual
+    function mesclarDelta(data) {
+        const trocados = new Set(data.removidos.concat(data.alertas.map(chaveOcorrencia)));
+        const base = ultimosDados ? ultimosDados.alertas : [];
+        const alertas = base
+            .filter(a => !trocados.has(chaveOcorrencia(a)))
+            .concat(data.alertas)
+            .sort((a, b) => (a.data_hora < b.data_hora ? -1 : a.data_hora > b.data_hora ? 1 : a.id - b.id));
+        return { alertas: alertas, next_check_at: data.next_check_at };
+    }
+
+    async function checkAlertasPendentes() {
+        try {
+            const url = cursor ? `${apiUrl}?since=${encodeURIComponent(cursor)}` : apiUrl;
+            const resp = await fetch(url, {
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                // revalida com If-None-Match: sem mudança o servidor
+                // responde 304 e o navegador reaproveita a cópia
+                cache: 'no-cache'
+            });
+
+            if (!resp.ok) {
+                // cursor recusado (400): a próxima consulta pede a lista inteira
+                cursor = null;
+                return null;
+            }
+
+            const data = await resp.json();
+            const completo = Array.isArray(data.removidos) ? mesclarDelta(data) : data;
+            cursor = data.cursor || null;
+            receberDoServidor(completo);
+            return data;
+        } catch (e) {
+            console.error('Erro ao buscar alertas pendentes:', e);
+            return null;
+        }
+    }
+
+    function calcularEspera(data) {
+        if (!data || !data.next_check_at) {
+            return INTERVALO_FALHA_MS;
+        }
+        const espera = new Date(data.next_check_at).getTime() - Date.now();
+        if (Number.isNaN(espera)) {
+            return INTERVALO_FALHA_MS;
+        }
+        return Math.min(Math.max(espera, INTERVALO_MINIMO_MS), INTERVALO_MAXIMO_MS);
+    }
+
+    async function verificarEAgendar() {
+        pollingTimer = null;
+        if (verificando) return; // a requisição em curso agenda a próxima
+        verificando = true;
+        const data = await checkAlertasPendentes();
+        verificando = false;
+        // o stream pode ter assumido enquanto a requisição estava no ar
+        if (pollingAtivo) {
+            pollingTimer = setTimeout(verificarEAgendar, calcularEspera(data));
+        }
+    }
+
+    function iniciarPolling() {
+        if (pollingAtivo) return;
+        pollingAtivo = true;
+        verificarEAgendar();
+    }
+
+    function pararPolling() {
+        pollingAtivo = false;
+        if (pollingTimer === null) return;
+        clearTimeout(pollingTimer);
+        pollingTimer = null;
+    }
+
+    // ao voltar para a aba, confere na hora em vez de esperar o timer
+    document.addEventListener('visibilitychange', function () {
+        if (document.visibilityState === 'visible' && pollingAtivo && pollingTimer !== null) {
+            clearTimeout(pollingTimer);
+            verificarEAgendar();
+        }
+    });
+
+    function iniciarStream() {
+        if (typeof EventSource === 'undefined') {
+            iniciarPolling();
+            return;
+        }
+
+        const source = new EventSource(streamUrl);
+
+        source.addEventListener('alertas', function (e) {
+            pararPolling();
+            // a lista do stream substitui a do polling, que fica sem cursor válido
+            cursor = null;
+            try {
+                receberDoServidor(JSON.parse(e.data));
+            } catch (err) {
+                console.error('Evento de alertas inválido:', err);
+            }
+        });
+
+        // servidor sem ASGI responde 204 e o EventSource fecha;
+        // enquanto estiver reconectando, o polling cobre o intervalo
+        source.onerror = function () {
+            iniciarPolling();
+        };
+    }
+
+    // -----------------------------
+    // Eleição da aba líder
+    // -----------------------------
+
+    function assumirLideranca() {
+        lider = true;
+        // stream SSE com fallback para checagem periódica
+        iniciarStream();
+    }
+
+    function iniciar() {
+        if (!canal || !navigator.locks) {
+            assumirLideranca();
+            return;
+        }
+
+        // o lock fica com esta aba até ela fechar (a promise nunca resolve);
+        // as outras esperam na fila e a próxima assume sozinha
+        navigator.locks.request(NOME_LOCK, function () {
+            assumirLideranca();
+            return new Promise(function () {});
+        });
+
+        // se já houver uma líder, ela responde com o estado atual
+        canal.postMessage({ tipo: 'pedir_estado' });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        if (typeof bootstrap === 'undefined') {
+            console.warn('Bootstrap não encontrado. Alertas não serão exibidos em modal.');
+            return;
+        }
+
+        modalEl = document.getElementById('alertaModal');
+
+        if (!modalEl) {
+            console.warn('Elemento #alertaModal não encontrado no DOM.');
+            return;
+        }
+
+        // Quando o modal é fechado, marca os alertas mostrados como confirmados
+        // nesta e nas outras abas
+        modalEl.addEventListener('hidden.bs.modal', function () {
+            if (currentModalIds.length) {
+                const ids = currentModalIds;
+                currentModalIds = [];
+                confirmar(ids);
+                if (canal) {
+                    canal.postMessage({ tipo: 'confirmados', ids: ids });
+                }
+                enviarConfirmacoes(ids);
+            }
+        });
+
+        // Clique na badge abre o modal com os alertas atuais
+        const badgeEl = document.getElementById('alertasBadge');
+        if (badgeEl) {
+            badgeEl.addEventListener('click', function (e) {
+                e.preventDefault();
+                e.stopPropagation();
+
+                if (latestPending.length > 0) {
+                    showAlertasModal(latestPending);
+                }
+            });
+        }
+
+        iniciar();
+    });
+})();
@@ -21,7 +21,7 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Form validation
-    const forms = document.querySelectorAll('form');
+    const forms = document.querySelectorAll('form:not([data-busca])');
     forms.forEach(function(form) {
         form.addEventListener('submit', function(e) {
             const submitButton = form.querySelector('button[type="submit"]');
@@ -44,22 +44,10 @@ document.addEventListener('DOMContentLoaded', function() {
         button.setAttribute('data-original-text', button.innerHTML);
     });
 
-    // Search functionality (if search input exists)
-    const searchInput = document.querySelector('#search');
-    if (searchInput) {
-        searchInput.addEventListener('input', function() {
-            const searchTerm = this.value.toLowerCase();
-            const tableRows = document.querySelectorAll('tbody tr');
-            
-            tableRows.forEach(function(row) {
-                const text = row.textContent.toLowerCase();
-                if (text.includes(searchTerm)) {
-                    row.style.display = '';
-                } else {
-                    row.style.display = 'none';
-                }
-            });
-        });
+    // Busca no servidor (listagens com form[data-busca])
+    const filtrosForm = document.querySelector('form[data-busca]');
+    if (filtrosForm) {
+        iniciarBuscaServidor(filtrosForm);
     }
 
     // Tooltip initialization
@@ -75,6 +63,64 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+// Busca com debounce: pede só as linhas da tabela em JSON (?formato=json)
+// e troca o <tbody> e a paginação, sem varrer o DOM nem recarregar a página.
+function iniciarBuscaServidor(form) {
+    const DEBOUNCE_MS = 300;
+    const tbody = document.getElementById('resultados');
+    const paginacao = document.getElementById('paginacao');
+    if (!tbody) return;
+
+    let timer = null;
+    let controller = null;
+
+    async function buscar() {
+        const params = new URLSearchParams(new FormData(form));
+        // limpa campos vazios para a URL ficar legível
+        for (const [chave, valor] of Array.from(params.entries())) {
+            if (!valor) params.delete(chave);
+        }
+        const query = params.toString();
+
+        params.set('formato', 'json');
+
+        if (controller) controller.abort();
+        controller = new AbortController();
+
+        try {
+            const resp = await fetch(`${window.location.pathname}?${params.toString()}`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                signal: controller.signal
+            });
+            if (!resp.ok) return;
+
+            const data = await resp.json();
+            tbody.innerHTML = data.html;
+            if (paginacao) paginacao.innerHTML = data.paginacao;
+
+            // mantém filtros na URL (voltar/atualizar reaproveitam a busca)
+            window.history.replaceState(null, '', query ? `?${query}` : window.location.pathname);
+        } catch (e) {
+            if (e.name !== 'AbortError') {
+                console.error('Erro na busca:', e);
+            }
+        }
+    }
+
+    function agendarBusca() {
+        clearTimeout(timer);
+        timer = setTimeout(buscar, DEBOUNCE_MS);
+    }
+
+    form.addEventListener('input', agendarBusca);
+    form.addEventListener('change', agendarBusca);
+    form.addEventListener('submit', function (e) {
+        e.preventDefault();
+        clearTimeout(timer);
+        buscar();
+    });
+}
+
 // Utility functions
 function showAlert(message, type = 'info') {
     const alertContainer = document.querySelector('.container');